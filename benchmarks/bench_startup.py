@@ -0,0 +1,81 @@
+"""
+Cold-start budget check for the CLI entry point.
+
+Imports src.main in fresh interpreters under `python -X importtime` and fails (exit code 1)
+if the best cumulative import time exceeds the budget, or if any heavy dependency
+(pandas, numpy, langgraph, langchain, openai, pydantic, pyarrow) is loaded at import time.
+Those are deferred until a run actually needs them, so `--help`, argument errors and shard
+worker processes start quickly. Also reports the wall time of `python -m src.main --help`.
+tests/test_startup.py runs both checks as part of the test suite (best of 5 imports;
+STARTUP_BUDGET_MS overrides the budget there).
+
+    python -m benchmarks.bench_startup --budget-ms 100
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+HEAVY_MODULES = ["pandas", "numpy", "langgraph", "langchain_core", "langchain_openai", "openai", "pydantic", "pyarrow"]
+
+
+def import_profile(module, cwd=None):
+    """{module name: cumulative microseconds} for one cold `import module`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        cumulative = cumulative.strip()
+        if cumulative.isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def help_wall_time():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "src.main", "--help"], capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI cold-start budget check.")
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Max cumulative import time of --module")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold imports to run; the fastest one is compared with the budget")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    import_ms = min(p.get(args.module, 0) for p in profiles) / 1000
+    heavy = sorted({name for p in profiles for name in p if name.split(".")[0] in HEAVY_MODULES and "." not in name})
+
+    result = {
+        "module": args.module,
+        "import_ms": round(import_ms, 1),
+        "budget_ms": args.budget_ms,
+        "help_wall_s": round(min(help_wall_time() for _ in range(args.repeat)), 3),
+        "heavy_imports": heavy,
+        "slowest_imports_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(profiles[0].items(), key=lambda item: -item[1])[1:6]
+        },
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {import_ms:.1f}ms (budget {args.budget_ms:.0f}ms)")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print(f"✅ Startup within budget ({import_ms:.1f}ms / {args.budget_ms:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
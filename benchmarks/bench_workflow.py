@@ -0,0 +1,191 @@
+"""
+Offline throughput benchmark for the full LangGraph workflow.
+
+Starts the stub LLM server (benchmarks/fake_llm_server.py), then runs the workflow
+from src/main.py in a fresh subprocess for each target size, pointing BaseAgent at
+the stub through OPENAI_BASE_URL. Prints (and optionally writes) one JSON document
+with reviews/sec, p50/p95 per-node latency, LLM calls per accepted review and peak
+RSS per size, tagged with the current git commit for comparison across commits.
+
+    python -m benchmarks.bench_workflow --sizes 50 500 5000 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import urllib.request
+
+from benchmarks.fake_llm_server import FakeLLMConfig, start_server
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_worker(args):
+    """Runs the workflow once in this process and prints a JSON result line."""
+    import resource
+    import src.main as m
+
+    workdir = tempfile.mkdtemp(prefix="forge-bench-")
+    output_path = os.path.join(workdir, "generated_reviews.parquet")
+    m.ensure_config()
+    m.config["output_path"] = output_path
+    m.config["llm_cache"] = {"enabled": False}
+    m.config.setdefault("yield_planner", {})["path"] = ""
+    m.config["parallel_ratings"] = args.parallel
+    m.config["streaming_generation"] = args.streaming
+    if args.max_llm_concurrency:
+        m.config["max_llm_concurrency"] = args.max_llm_concurrency
+
+    distribution = m.config.get("rating_distribution", [0.2] * 5)
+    jobs = [(float(i + 1), int(args.size * ratio)) for i, ratio in enumerate(distribution) if int(args.size * ratio) > 0]
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        m.registry.configure_llm_concurrency(m.config.get("max_llm_concurrency"))
+        m.registry.configure_llm_cache(enabled=False)
+        metrics = m.configure_metrics(None)
+        m.configure_resilience(**m.config.get("resilience", {}))
+        m.registry.configure_rate_limits({"rpm": args.rpm, "tpm": args.tpm})
+        app = m.build_graph(streaming=args.streaming)
+
+        start = time.perf_counter()
+        accepted = 0
+        generated = 0
+        with m.open_output(output_path) as sink:
+            for rating, final_state in m.run_distribution(app, jobs, parallel=args.parallel):
+                reviews = final_state.get("accepted_reviews", [])
+                accepted += len(reviews)
+                generated += final_state.get("cumulative_generated", 0)
+                m.save_reviews(reviews, sink)
+        duration = time.perf_counter() - start
+
+    llm_groups = metrics.llm_summary().values()
+
+    result = {
+        "size": args.size,
+        "accepted": accepted,
+        "generated": generated,
+        "duration_s": round(duration, 3),
+        "reviews_per_s": round(accepted / duration, 3) if duration > 0 else 0.0,
+        "node_latency_s": {
+            name: {
+                "count": stats["count"],
+                "p50": round(stats["p50"], 4),
+                "p95": round(stats["p95"], 4),
+            } for name, stats in sorted(metrics.stage_summary().items())
+        },
+        "prefilter_reviews_skipped": m.prefilter_savings()[0],
+        "judge_calls_saved": round(m.prefilter_savings()[1], 1),
+        "queue_wait_s": round(sum(g["queue_wait_s"] for g in llm_groups), 3),
+        "prompt_tokens": sum(g["prompt_tokens"] for g in llm_groups),
+        "completion_tokens": sum(g["completion_tokens"] for g in llm_groups),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    print(json.dumps(result))
+
+
+def http_json(url, method="GET"):
+    request = urllib.request.Request(url, data=b"{}" if method == "POST" else None, method=method,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def run_suite(args):
+    cfg = FakeLLMConfig(latency=args.latency, latency_jitter=args.latency_jitter, failure_rate=args.failure_rate,
+                        pass_rate=args.pass_rate, seed=args.seed)
+    server = start_server(cfg)
+    root = f"http://127.0.0.1:{server.server_port}"
+
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"{root}/v1")
+    env.pop("OPENROUTER_API_KEY", None)
+
+    results = []
+    for size in args.sizes:
+        http_json(f"{root}/reset", method="POST")
+        command = [sys.executable, "-m", "benchmarks.bench_workflow", "--worker", "--size", str(size)]
+        if args.parallel:
+            command.append("--parallel")
+        if args.streaming:
+            command.append("--streaming")
+        if args.max_llm_concurrency:
+            command += ["--max-llm-concurrency", str(args.max_llm_concurrency)]
+        if args.rpm:
+            command += ["--rpm", str(args.rpm)]
+        if args.tpm:
+            command += ["--tpm", str(args.tpm)]
+
+        print(f"⏱️ Benchmarking {size} reviews...", file=sys.stderr)
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            raise SystemExit(f"❌ Benchmark worker failed for size {size}")
+
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        server_stats = http_json(f"{root}/stats")
+        result["llm_calls"] = server_stats["requests"]
+        result["llm_failures"] = server_stats["failures"]
+        result["llm_calls_per_accepted"] = round(server_stats["requests"] / result["accepted"], 3) if result["accepted"] else None
+        results.append(result)
+
+    server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "latency": args.latency,
+            "latency_jitter": args.latency_jitter,
+            "failure_rate": args.failure_rate,
+            "pass_rate": args.pass_rate,
+            "parallel_ratings": args.parallel,
+            "streaming_generation": args.streaming,
+            "max_llm_concurrency": args.max_llm_concurrency,
+            "rpm": args.rpm,
+            "tpm": args.tpm,
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline workflow throughput benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean stub latency per LLM call (s)")
+    parser.add_argument("--latency-jitter", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--pass-rate", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parallel", action="store_true", help="Run the rating pipelines in parallel")
+    parser.add_argument("--streaming", action="store_true", help="Use streaming generation")
+    parser.add_argument("--max-llm-concurrency", type=int, default=None)
+    parser.add_argument("--rpm", type=int, default=None, help="Per-model requests/minute limit (default: unlimited)")
+    parser.add_argument("--tpm", type=int, default=None, help="Per-model tokens/minute limit (default: unlimited)")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this path")
+    # Internal: run a single workflow in this process
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, default=50, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
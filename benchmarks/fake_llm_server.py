@@ -0,0 +1,220 @@
+"""
+Local stub of an OpenAI-compatible /v1/chat/completions endpoint.
+
+Answers generator prompts with a canned ReviewList, single judge prompts with a
+ReviewVerdict and batched judge prompts with a ReviewVerdictList, so the whole
+LangGraph workflow can run offline. Latency and failure rate are configurable.
+
+    python -m benchmarks.fake_llm_server --port 8765 --latency 0.2 --failure-rate 0.05
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Synthetic vocabulary so generated reviews don't collide in the near-duplicate index
+VOCAB = [f"{a}{b}" for a in ("code", "ext", "git", "term", "debug", "lint", "theme", "tab", "file", "key")
+         for b in ("alpha", "bravo", "delta", "echo", "golf", "hotel", "india", "kilo", "lima", "mike",
+                   "oscar", "papa", "romeo", "sierra", "tango", "victor", "whisky", "xray", "yankee", "zulu")]
+
+
+class FakeLLMConfig:
+    def __init__(self, latency=0.1, latency_jitter=0.05, failure_rate=0.0, pass_rate=0.8,
+                 words_per_review=40, seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.pass_rate = pass_rate
+        self.words_per_review = words_per_review
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "generate": 0, "judge": 0, "judge_batch": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def words(self, n):
+        with self.lock:
+            return " ".join(self.rng.choice(VOCAB) for _ in range(n))
+
+
+def _prompt_text(body):
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(c.get("text", "") for c in content if isinstance(c, dict))
+        parts.append(content)
+    return "\n".join(parts)
+
+
+def _verdict(cfg):
+    passed = cfg.random() < cfg.pass_rate
+    return {
+        "verdict": "PASS" if passed else "FAIL",
+        "quality_score": 6 + int(cfg.random() * 4) if passed else 1 + int(cfg.random() * 5),
+        "reason": "Stub verdict." if passed else "Stub rejection: too generic.",
+    }
+
+
+def canned_response(prompt, cfg):
+    """Returns (kind, content) for a rendered prompt."""
+    batch = re.search(r"numbered 0 to (\d+)", prompt)
+    if batch:
+        cfg.count("judge_batch")
+        verdicts = [dict(_verdict(cfg), index=i) for i in range(int(batch.group(1)) + 1)]
+        return "judge_batch", json.dumps({"verdicts": verdicts})
+
+    if "GENERATED REVIEW TO EVALUATE" in prompt:
+        cfg.count("judge")
+        return "judge", json.dumps(_verdict(cfg))
+
+    count = re.search(r"create (\d+) new", prompt)
+    n = int(count.group(1)) if count else 5
+    cfg.count("generate")
+    reviews = [{
+        "general": cfg.words(cfg.words_per_review),
+        "pros": cfg.words(cfg.words_per_review // 4),
+        "cons": cfg.words(cfg.words_per_review // 4),
+    } for _ in range(n)]
+    return "generate", json.dumps({"reviews": reviews})
+
+
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with cfg.lock:
+                    self._send_json(200, dict(cfg.stats))
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.rstrip("/") == "/reset":
+                with cfg.lock:
+                    for key in cfg.stats:
+                        cfg.stats[key] = 0
+                self._send_json(200, {"ok": True})
+                return
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            cfg.count("requests")
+            time.sleep(max(0.0, cfg.latency + (cfg.random() * 2 - 1) * cfg.latency_jitter))
+
+            if cfg.random() < cfg.failure_rate:
+                cfg.count("failures")
+                status = 429 if cfg.random() < 0.5 else 500
+                self._send_json(status, {"error": {"message": "Stub failure", "type": "rate_limit_error" if status == 429 else "server_error"}})
+                return
+
+            prompt = _prompt_text(body)
+            _, content = canned_response(prompt, cfg)
+            model = body.get("model", "stub")
+            usage = {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": len(prompt) // 4 + len(content) // 4,
+            }
+
+            if body.get("stream"):
+                self._stream(model, content, usage)
+                return
+
+            self._send_json(200, {
+                "id": f"chatcmpl-stub-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def _stream(self, model, content, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            chunk_id = f"chatcmpl-stub-{time.time_ns()}"
+
+            def event(delta, finish_reason=None, extra=None):
+                payload = {
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                if extra:
+                    payload.update(extra)
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            event({"role": "assistant", "content": ""})
+            for i in range(0, len(content), 64):
+                event({"content": content[i:i + 64]})
+            event({}, finish_reason="stop", extra={"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(cfg, host="127.0.0.1", port=0):
+    """Starts the stub server on a background thread and returns it (server.server_port holds the port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean seconds per request")
+    parser.add_argument("--latency-jitter", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 429/500")
+    parser.add_argument("--pass-rate", type=float, default=0.8, help="Fraction of PASS verdicts")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = FakeLLMConfig(latency=args.latency, latency_jitter=args.latency_jitter, failure_rate=args.failure_rate,
+                        pass_rate=args.pass_rate, seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    print(f"🧪 Fake LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import List
+from .ReviewVerdict import ReviewVerdict
+
+class IndexedReviewVerdict(ReviewVerdict):
+    index: int = Field(description="The index of the evaluated review, exactly as numbered in the prompt")
+
+class ReviewVerdictList(BaseModel):
+    verdicts: List[IndexedReviewVerdict] = Field(description="One verdict per generated review, keyed by its index")
@@ -8,5 +8,7 @@ class WorkflowState(TypedDict):
     accepted_reviews: Annotated[List[Dict[str, Any]], operator.add]
     current_generated_reviews: List[Dict[str, Any]]
     cumulative_generated: Annotated[int, operator.add]
+    cumulative_surplus: Annotated[int, operator.add]
+    current_candidates: List[Dict[str, Any]]
     current_judgments: List[Dict[str, Any]]
     iteration: int
\ No newline at end of file
@@ -1,6 +1,25 @@
-from .Review import Review
-from .ReviewList import ReviewList
-from .ReviewVerdict import ReviewVerdict
-from .WorkflowState import WorkflowState
+import importlib
 
-__all__ = ["Review", "ReviewList", "ReviewVerdict", "WorkflowState"]
+# Models are imported on first access (PEP 562); WorkflowState alone does not need pydantic
+_EXPORTS = {
+    "Review": ".Review",
+    "ReviewList": ".ReviewList",
+    "ReviewVerdict": ".ReviewVerdict",
+    "IndexedReviewVerdict": ".ReviewVerdictList",
+    "ReviewVerdictList": ".ReviewVerdictList",
+    "WorkflowState": ".WorkflowState",
+}
+
+__all__ = ["Review", "ReviewList", "ReviewVerdict", "IndexedReviewVerdict", "ReviewVerdictList", "WorkflowState"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -9,38 +9,38 @@ from .base_agent import BaseAgent
 from src.Models import Review, ReviewList
 
 from src.utils import parse_rating, load_csv_data
+from src.utils.resilience import get_resilience, is_retryable
+
+def tag_model(review, model_name):
+    """Copy of a generated review dict that records which model wrote it."""
+    return {**review, "generator_model": model_name} if isinstance(review, dict) else review
+
 
 class ReviewGenerator(BaseAgent):
-    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.7, csv_path="data/real_reviews_capterra.csv", rating_column="rating", persona="a Technical Reviewer", review_characteristics=None):
-        super().__init__(model=model, rollback_model=rollback_model, temperature=temperature, csv_path=csv_path, rating_column=rating_column)
+    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.7, csv_path="data/real_reviews_capterra.csv", rating_column="rating", persona="a Technical Reviewer", review_characteristics=None, use_cache=False, seed=None):
+        super().__init__(model=model, rollback_model=rollback_model, temperature=temperature, csv_path=csv_path, rating_column=rating_column, use_cache=use_cache, seed=seed)
         self.persona = persona
         self.review_characteristics = review_characteristics or {}
 
-    def generate_reviews(self, target_rating, count=5):
+    def _build_prompt(self, target_rating, count):
         """
-        Generates fake reviews based on the style of existing reviews with the target rating.
+        Builds the generation prompt, parser and inputs for the target rating.
+        Returns None if there are no real reviews to use as style examples.
         """
-        # Filter by rating
-        filtered_df = self.df[self.df[self.rating_column] == float(target_rating)]
+        available = self.few_shot.count(target_rating)
 
-        if filtered_df.empty:
+        if available == 0:
             print(f"ℹ️ No reviews found with rating '{target_rating}'. Cannot generate samples.")
             return
 
-        # Select random samples
-        sample_count = min(len(filtered_df), 5)
-        samples = filtered_df.sample(n=sample_count)
+        # Select random samples (pre-rendered in General/Pros/Cons format)
+        samples = self.few_shot.sample(target_rating, 5)
+        sample_count = len(samples)
         
-        print(f"✅ Found {len(filtered_df)} reviews with rating {target_rating}. Using {sample_count} samples for style transfer.")
+        print(f"✅ Found {available} reviews with rating {target_rating}. Using {sample_count} samples for style transfer.")
 
         # formatting samples for the prompt
-        samples_text = ""
-        for i, row in samples.iterrows():
-            samples_text += f"Review {i+1}:\n"
-            samples_text += f"General: {row.get('general', 'N/A')}\n"
-            samples_text += f"Pros: {row.get('pros', 'N/A')}\n"
-            samples_text += f"Cons: {row.get('cons', 'N/A')}\n"
-            samples_text += "-" * 20 + "\n"
+        samples_text = "".join(f"Review {i + 1}:\n{sample}" for i, sample in enumerate(samples))
         
         # Prepare Characteristics Context
         characteristics_text = ""
@@ -81,48 +81,84 @@ class ReviewGenerator(BaseAgent):
             partial_variables={"format_instructions": parser.get_format_instructions()}
         )
 
-        chain = prompt | self.llm | parser
+        inputs = {
+            "count": count,
+            "target_rating": target_rating,
+            "sample_count": sample_count,
+            "samples_text": samples_text,
+            "persona": self.persona,
+            "characteristics_text": characteristics_text
+        }
+        return prompt, parser, inputs
+
+    def generate_reviews(self, target_rating, count=5):
+        """
+        Generates fake reviews based on the style of existing reviews with the target rating.
+        Each review is tagged with the generator_model that wrote it (the rollback model after a fallback).
+        """
+        built = self._build_prompt(target_rating, count)
+        if built is None:
+            return
+        prompt, parser, inputs = built
 
         print("🧠 Generating reviews using LLM (JSON Output)...")
         try:
-            result = chain.invoke({
-                "count": count,
-                "target_rating": target_rating,
-                "sample_count": sample_count,
-                "samples_text": samples_text,
-                "persona": self.persona,
-                "characteristics_text": characteristics_text
-            })
-            
-            print("\n" + "="*40)
-            print("✨ GENERATED REVIEWS ✨")
-            print("="*40)
-            print(result)
-            return result
+            # Retries, circuit breaking and rollback are handled by the shared resilience policy
+            model_name, result = self.invoke_resilient_with_model(prompt, parser, inputs)
+        except Exception as e:
+            print(f"❌ Error generating reviews: {e}")
+            if not self.rollback_llm:
+                print("⚠️ No rollback model configured.")
+            return
+
+        if isinstance(result, dict) and isinstance(result.get("reviews"), list):
+            result = {**result, "reviews": [tag_model(r, model_name) for r in result["reviews"]]}
+
+        print("\n" + "="*40)
+        print("✨ GENERATED REVIEWS ✨")
+        print("="*40)
+        print(result)
+        return result
+
+    def stream_reviews(self, target_rating, count=5):
+        """
+        Streaming variant of generate_reviews: yields each review dict as soon as it is
+        complete in the LLM's partial JSON output, instead of waiting for the whole list.
+        Reviews are tagged with generator_model like in generate_reviews. Opening the stream goes through the shared resilience policy (see BaseAgent.stream_resilient).
+        """
+        built = self._build_prompt(target_rating, count)
+        if built is None:
+            return
+        prompt, parser, inputs = built
+
+        print("🧠 Streaming reviews from LLM (JSON Output)...")
+        try:
+            model_name, partials = self.stream_resilient(prompt, parser, inputs)
+        except Exception as e:
+            print(f"❌ Error streaming reviews: {e}")
+            if not self.rollback_llm:
+                print("⚠️ No rollback model configured.")
+            return
 
+        emitted = 0
+        try:
+            reviews = []
+            for partial in partials:
+                if isinstance(partial, dict):
+                    reviews = partial.get("reviews") or []
+                # A review is complete once the model has started the next one
+                while emitted < len(reviews) - 1:
+                    yield tag_model(reviews[emitted], model_name)
+                    emitted += 1
+            # The last review is complete once the stream ends
+            while emitted < len(reviews):
+                yield tag_model(reviews[emitted], model_name)
+                emitted += 1
         except Exception as e:
-            print(f"❌ Error generating reviews with primary model: {e}")
-            if self.rollback_llm:
-                print(f"🔄 Attempting rollback with model: {self.rollback_model}")
-                try:
-                    chain_rollback = prompt | self.rollback_llm | parser
-                    result = chain_rollback.invoke({
-                        "count": count,
-                        "target_rating": target_rating,
-                        "sample_count": sample_count,
-                        "samples_text": samples_text,
-                        "persona": self.persona,
-                        "characteristics_text": characteristics_text
-                    })
-                    print("\n" + "="*40)
-                    print("✨ GENERATED REVIEWS (ROLLBACK) ✨")
-                    print("="*40)
-                    print(result)
-                    return result
-                except Exception as rollback_e:
-                     print(f"❌ Rollback failed as well: {rollback_e}")
-            else:
-                 print("⚠️ No rollback model configured.")
+            # Not retried: the reviews already handed to the judge would be generated twice
+            print(f"❌ Error streaming reviews with model {model_name}: {e}")
+            if is_retryable(e):
+                get_resilience().breaker(model_name).record_failure()
 
 if __name__ == "__main__":
     generator = ReviewGenerator()
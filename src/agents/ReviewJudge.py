@@ -1,85 +1,270 @@
+import math
+import threading
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from src.utils import parse_rating, load_csv_data
+from src.utils import parse_rating, load_csv_data, NearDuplicateIndex, EmbeddingIndex
+from src.utils.embedding_index import review_body
+from src.utils.output_sink import read_output
+from src.utils.resilience import get_resilience, is_retryable
 from .base_agent import BaseAgent
-from src.Models import ReviewVerdict
+from . import registry
+from src.Models import ReviewVerdict, ReviewVerdictList
+
+QUALITY_CRITERIA = """QUALITY GUARDRAILS & CRITERIA:
+        1. **Tone & Style**: Does it sound like a genuine Capterra user? 
+           - FAIL if it sounds like a press release, marketing copy, or an AI writing an essay.
+           - FAIL if it is overly generic (e.g., "This tool is a game changer for my workflow" without specifics).
+        
+        2. **Bias Detection**: 
+           - FAIL if the sentiment is realistically skewed (e.g., a 1-star review praising everything, or a 5-star review listing only bugs).
+           - FAIL if it exhibits patterns of "hallucinated positivity" (making up features vs code doesn't have).
+
+        3. **Domain Realism**:
+           - FAIL if it uses incorrect terminology (e.g., calling Extensions "Plugins", calling the Command Palette "The Search Bar").
+           - FAIL if it mentions features VS Code doesn't typically handle (e.g., "video editing capabilities").
+
+        4. **Formatting**: Does it loosely follow the General/Pros/Cons structure?
+
+        5. **Quality Scoring (1-10)**:
+           - **1-3 (Fail)**: Obvious fake, hallucinated features, or marketing spam.
+           - **4-6 (Fail/Borderline)**: Realistic but generic, lacks depth, or slight tone mismatch.
+           - **7-8 (Pass)**: Good quality, realistic features, appropriate tone.
+           - **9-10 (Pass)**: Indistinguishable from a thoughtful real user review."""
 
 class ReviewJudge(BaseAgent):
-    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.0, csv_path="data/real_reviews_capterra.csv", rating_column="rating", persona="an expert Review Quality Judge", review_characteristics=None):
-        super().__init__(model=model, rollback_model=rollback_model, temperature=temperature, csv_path=csv_path, rating_column=rating_column)
+    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.0, csv_path="data/real_reviews_capterra.csv", rating_column="rating", persona="an expert Review Quality Judge", review_characteristics=None, max_concurrency=1, call_timeout=None, batch_size=1, use_cache=True, similarity_threshold=0.7, semantic_threshold=0.85, semantic_history_size=5000, leakage_threshold=0.8, seed=None):
+        super().__init__(model=model, rollback_model=rollback_model, temperature=temperature, csv_path=csv_path, rating_column=rating_column, use_cache=use_cache, seed=seed, request_timeout=call_timeout)
         self.persona = persona
         self.review_characteristics = review_characteristics or {}
+        # Max number of judge LLM calls in flight per batch (1 = sequential)
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        # Seconds per judge HTTP request (None = client default). It bounds the request itself, on
+        # the inline and the executor path; verdict_deadline() is only a backstop for the executor
+        self.call_timeout = call_timeout
+        # Number of reviews judged together in one prompt (1 = one prompt per review)
+        self.batch_size = max(1, int(batch_size or 1))
+        # Jaccard similarity above which a review counts as a near-duplicate
+        self.similarity_threshold = similarity_threshold
+        # Every review accepted so far (previous runs, other ratings, earlier iterations)
+        self.history_index = NearDuplicateIndex(threshold=similarity_threshold)
+        # Cosine similarity (hashed embeddings) above which a review is a paraphrase of an accepted one.
+        # Paraphrases only matter within a rating's pool, so accepted reviews are indexed per rating,
+        # each index keeping at most the semantic_history_size most recent ones
+        self.semantic_threshold = semantic_threshold
+        self.semantic_history_size = semantic_history_size
+        self._semantic_indexes = {}
+        self._semantic_lock = threading.Lock()
+        # Serialises remember()'s check-then-insert across both indexes
+        self._remember_lock = threading.Lock()
+        # Cosine similarity above which a review counts as copied from the real corpus
+        self.corpus_index = registry.get_corpus_index(csv_path, rating_column, leakage_threshold) if leakage_threshold else None
 
-    def calculate_jaccard_similarity(self, text1: str, text2: str) -> float:
-        """Calculates Jaccard similarity between two texts."""
-        set1 = set(text1.lower().split())
-        set2 = set(text2.lower().split())
-        if not set1 or not set2:
-            return 0.0
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
-        return intersection / union
+    @staticmethod
+    def format_review_text(review):
+        """Renders a review dict in the General/Pros/Cons layout used for judging and dedup."""
+        def field(name):
+            value = review.get(name, 'N/A')
+            return value if isinstance(value, str) else 'N/A'
+        review_text = f"General: {field('general')}\n"
+        review_text += f"Pros: {field('pros')}\n"
+        review_text += f"Cons: {field('cons')}"
+        return review_text
+
+    def load_history(self, path, fmt=None):
+        """Indexes previously generated reviews (e.g. the existing output) for cross-run dedup."""
+        df = read_output(path, fmt)
+        if df.empty:
+            return 0
+        rows = df.to_dict("records")
+        for row in rows:
+            self.history_index.add(self.format_review_text(row))
+        if self.semantic_threshold:
+            by_rating = {}
+            for row in rows:
+                by_rating.setdefault(parse_rating(row.get("generated_rating")), []).append(review_body(row))
+            for rating, bodies in by_rating.items():
+                self.semantic_index(rating).add_many(bodies)
+        print(f"🗂️ Indexed {len(df)} previously generated reviews for near-duplicate detection.")
+        return len(df)
+
+    def remember(self, reviews):
+        """
+        Adds accepted reviews to the history and semantic indexes.
+        Returns (kept, rejected) where rejected holds (review, similarity) pairs that
+        turned out to duplicate something accepted concurrently.
+        """
+        kept, rejected = [], []
+        for review in reviews:
+            text = self.format_review_text(review)
+            semantic = self.semantic_index(review.get("generated_rating")) if self.semantic_threshold else None
+            # Both indexes are checked before either is updated, so a review rejected by one never
+            # lands in the other; the lock keeps check-and-insert atomic across rating pipelines
+            with self._remember_lock:
+                match = self.history_index.query(text)
+                if not match and semantic is not None:
+                    match = semantic.query(review_body(review))
+                if not match:
+                    self.history_index.add(text)
+                    if semantic is not None:
+                        semantic.add(review_body(review))
+            if match:
+                rejected.append((review, match[1]))
+            else:
+                kept.append(review)
+        return kept, rejected
 
     def evaluate_reviews(self, generated_reviews: List[Dict[str, Any]], target_rating: float):
         """
-        Evaluates a list of generated reviews. Checks for internal diversity first.
+        Evaluates a list of generated reviews. Checks for diversity first (within the batch
+        and against every previously accepted review) and for copies of real reviews, then judges the remaining reviews
+        (concurrently if max_concurrency > 1, K at a time if batch_size > 1).
+        Results are returned in input order.
+        """
+        return self.evaluate_stream(generated_reviews, target_rating)
+
+    def evaluate_stream(self, reviews, target_rating: float):
+        """
+        Same as evaluate_reviews, but consumes any iterable of reviews (e.g. the generator's
+        stream). Each review is diversity-checked on arrival and dispatched to the judge
+        pool as soon as a chunk of batch_size is ready, so judging overlaps with production.
+        Results are returned in input order once the iterable is exhausted.
         """
+        generated_reviews = []
         results = []
-        seen_texts = []
+        batch_index = NearDuplicateIndex(threshold=self.similarity_threshold)
+        batch_semantic = EmbeddingIndex(threshold=self.semantic_threshold) if self.semantic_threshold else None
+        chunk = []
+        futures = []
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency) if self.max_concurrency > 1 else None
 
-        for review in generated_reviews:
-            review_text = f"General: {review.get('general', 'N/A')}\n"
-            review_text += f"Pros: {review.get('pros', 'N/A')}\n"
-            review_text += f"Cons: {review.get('cons', 'N/A')}"
-            
-            # 1. Diversity Guardrail (Jaccard Similarity)
-            is_duplicate = False
-            for seen in seen_texts:
-                similarity = self.calculate_jaccard_similarity(review_text, seen)
-                if similarity > 0.7: # Threshold for "too similar"
-                    results.append({
-                        "review": review,
-                        "judgment": {"verdict": "FAIL", "reason": f"Diversity Check Failed: Review is {similarity:.2f} similar to another in this batch."}
-                    })
-                    is_duplicate = True
-                    break
-            
-            if is_duplicate:
-                continue
+        def dispatch(chunk):
+            if executor is None:
+                for idx, verdict in self._judge_chunk(chunk, target_rating):
+                    results[idx] = {"review": generated_reviews[idx], "judgment": verdict}
+            else:
+                futures.append((chunk, executor.submit(self._judge_chunk, chunk, target_rating)))
+
+        try:
+            for idx, review in enumerate(reviews):
+                generated_reviews.append(review)
+                results.append(None)
+                review_text = self.format_review_text(review)
 
-            seen_texts.append(review_text)
+                # 1. Diversity & Leakage Guardrails (Jaccard near-duplicates, embedding paraphrases, copied real reviews)
+                body = review_body(review)
+                failure = self._diversity_check(review_text, batch_index) or self._semantic_check(body, target_rating, batch_semantic)
+                if failure:
+                    results[idx] = {"review": review, "judgment": failure}
+                    continue
+                # Only reviews that passed every check count as batch members for the ones after them
+                batch_index.add(review_text)
+                if batch_semantic is not None:
+                    batch_semantic.add(body)
 
-            # 2. LLM Evaluation (Bias, Realism, Style)
-            verdict = self.evaluate_single_review(review_text, target_rating)
-            results.append({
-                "review": review,
-                "judgment": verdict
-            })
+                # 2. LLM Evaluation (Bias, Realism, Style)
+                chunk.append((idx, review_text))
+                if len(chunk) >= self.batch_size:
+                    dispatch(chunk)
+                    chunk = []
+
+            if chunk:
+                dispatch(chunk)
+
+            deadline = self.verdict_deadline()
+            for chunk, future in futures:
+                try:
+                    verdicts = future.result(timeout=deadline)
+                except FutureTimeoutError:
+                    print(f"⏱️ Judgment timed out after {deadline:.0f}s.")
+                    verdicts = [(idx, {"verdict": "ERROR", "reason": f"Judgment timed out after {deadline:.0f}s"}) for idx, _ in chunk]
+                except Exception as e:
+                    verdicts = [(idx, {"verdict": "ERROR", "reason": str(e)}) for idx, _ in chunk]
+                for idx, verdict in verdicts:
+                    results[idx] = {"review": generated_reviews[idx], "judgment": verdict}
+        finally:
+            if executor is not None:
+                # Don't block on calls that timed out; they finish in the background
+                executor.shutdown(wait=False, cancel_futures=True)
         return results
 
-    def evaluate_single_review(self, generated_review_text, target_rating):
+    def verdict_deadline(self):
         """
-        Evaluates a single review text against real reviews of the same rating.
+        Seconds to wait for one chunk's verdicts on the executor path: every attempt the retry
+        policy may make at call_timeout each, plus its longest backoffs (None = wait forever).
         """
-        filtered_df = self.df[self.df[self.rating_column] == float(target_rating)]
+        if not self.call_timeout:
+            return None
+        policy = get_resilience()
+        return self.call_timeout * (policy.max_retries + 1) + policy.backoff_max * policy.max_retries
+
+    def _diversity_check(self, review_text, batch_index):
+        """Returns a FAIL judgment if the review near-duplicates an accepted or batch review, else None."""
+        match = self.history_index.query(review_text)
+        if match:
+            return {"verdict": "FAIL", "reason": f"Diversity Check Failed: Review is {match[1]:.2f} similar to a previously accepted review."}
+
+        match = batch_index.query(review_text)
+        if match:
+            return {"verdict": "FAIL", "reason": f"Diversity Check Failed: Review is {match[1]:.2f} similar to another in this batch."}
+        return None
+
+    def semantic_index(self, rating):
+        """The embedding index of accepted reviews for `rating`, created on first use."""
+        key = parse_rating(rating)
+        if key is not None and math.isnan(key):
+            key = None
+        with self._semantic_lock:
+            if key not in self._semantic_indexes:
+                self._semantic_indexes[key] = EmbeddingIndex(threshold=self.semantic_threshold, max_size=self.semantic_history_size)
+            return self._semantic_indexes[key]
+
+    def _semantic_check(self, body, rating, batch_semantic):
+        """
+        Returns a FAIL judgment if the review copies a real review (ground-truth leakage) or
+        paraphrases an accepted or batch review by embedding similarity, else None.
+        """
+        if self.corpus_index is not None:
+            match = self.corpus_index.query(body)
+            if match:
+                return {"verdict": "FAIL", "reason": f"Leakage Check Failed: Review is {match[1]:.2f} similar to a real review from the corpus."}
+
+        if not self.semantic_threshold:
+            return None
+        match = self.semantic_index(rating).query(body)
+        if match:
+            return {"verdict": "FAIL", "reason": f"Diversity Check Failed: Review is semantically {match[1]:.2f} similar to a previously accepted review."}
+
+        match = batch_semantic.query(body)
+        if match:
+            return {"verdict": "FAIL", "reason": f"Diversity Check Failed: Review is semantically {match[1]:.2f} similar to another in this batch."}
+        return None
+
+    def _judge_chunk(self, chunk, target_rating):
+        """Judges one chunk of (index, review_text) pairs and returns (index, verdict) pairs."""
+        if len(chunk) == 1:
+            idx, review_text = chunk[0]
+            return [(idx, self.evaluate_single_review(review_text, target_rating))]
+
+        verdicts = self.evaluate_batch([text for _, text in chunk], target_rating)
+        return [(idx, verdict) for (idx, _), verdict in zip(chunk, verdicts)]
+
+    def _sample_ground_truth(self, target_rating, sample_count=10, key=None):
+        """
+        Returns a formatted block of up to sample_count real reviews for the rating, or None.
+        The subset is derived from key (the text being judged) so re-judging the same text
+        renders the same prompt.
+        """
+        samples = self.few_shot.sample(target_rating, sample_count, key=key)
         
-        if filtered_df.empty:
+        if not samples:
             print(f"⚠️ No real reviews found for rating {target_rating} to compare against.")
-            return {"verdict": "UNKNOWN", "reason": "No ground truth matches found."}
+            return None
 
-        sample_count = min(len(filtered_df), 10)
-        samples = filtered_df.sample(n=sample_count)
-        
-        samples_text = ""
-        for i, row in samples.iterrows():
-            samples_text += f"[Real Review]\n"
-            samples_text += f"General: {row.get('general', 'N/A')}\n"
-            samples_text += f"Pros: {row.get('pros', 'N/A')}\n"
-            samples_text += f"Cons: {row.get('cons', 'N/A')}\n"
-            samples_text += "-" * 20 + "\n"
-        
-        # Prepare Characteristics Context
+        return "".join(f"[Real Review]\n{sample}" for sample in samples)
+
+    def _characteristics_text(self):
         characteristics_text = ""
         if self.review_characteristics:
             tones = self.review_characteristics.get('tones', [])
@@ -90,6 +275,23 @@ class ReviewJudge(BaseAgent):
                 characteristics_text += f"- Acceptable Tones: {', '.join(tones)}\n"
             if focus_topics:
                 characteristics_text += f"- Acceptable Topics: {', '.join(focus_topics)}\n"
+        return characteristics_text
+
+    def _invoke_with_rollback(self, prompt, parser, inputs):
+        """Invokes prompt | llm | parser through the shared resilience policy (retries, breaker, rollback). Raises on failure."""
+        try:
+            return self.invoke_resilient(prompt, parser, inputs)
+        except Exception as e:
+            print(f"❌ Judgment Error: {e}")
+            raise
+
+    def evaluate_single_review(self, generated_review_text, target_rating):
+        """
+        Evaluates a single review text against real reviews of the same rating.
+        """
+        samples_text = self._sample_ground_truth(target_rating, key=generated_review_text)
+        if samples_text is None:
+            return {"verdict": "UNKNOWN", "reason": "No ground truth matches found."}
 
         parser = JsonOutputParser(pydantic_object=ReviewVerdict)
 
@@ -107,26 +309,7 @@ class ReviewJudge(BaseAgent):
         GENERATED REVIEW TO EVALUATE:
         {generated_review}
 
-        QUALITY GUARDRAILS & CRITERIA:
-        1. **Tone & Style**: Does it sound like a genuine Capterra user? 
-           - FAIL if it sounds like a press release, marketing copy, or an AI writing an essay.
-           - FAIL if it is overly generic (e.g., "This tool is a game changer for my workflow" without specifics).
-        
-        2. **Bias Detection**: 
-           - FAIL if the sentiment is realistically skewed (e.g., a 1-star review praising everything, or a 5-star review listing only bugs).
-           - FAIL if it exhibits patterns of "hallucinated positivity" (making up features vs code doesn't have).
-
-        3. **Domain Realism**:
-           - FAIL if it uses incorrect terminology (e.g., calling Extensions "Plugins", calling the Command Palette "The Search Bar").
-           - FAIL if it mentions features VS Code doesn't typically handle (e.g., "video editing capabilities").
-
-        4. **Formatting**: Does it loosely follow the General/Pros/Cons structure?
-
-        5. **Quality Scoring (1-10)**:
-           - **1-3 (Fail)**: Obvious fake, hallucinated features, or marketing spam.
-           - **4-6 (Fail/Borderline)**: Realistic but generic, lacks depth, or slight tone mismatch.
-           - **7-8 (Pass)**: Good quality, realistic features, appropriate tone.
-           - **9-10 (Pass)**: Indistinguishable from a thoughtful real user review.
+        {criteria}
 
         Response must be in JSON format:
         {format_instructions}
@@ -135,41 +318,102 @@ class ReviewJudge(BaseAgent):
         prompt = PromptTemplate(
             input_variables=["target_rating", "samples_text", "generated_review", "characteristics_text"],
             template=template,
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+            partial_variables={"format_instructions": parser.get_format_instructions(), "criteria": QUALITY_CRITERIA}
         )
 
-        chain = prompt | self.llm | parser
-
         # print(f"⚖️ Judging review against {sample_count} real samples...")
         try:
-            result = chain.invoke({
+            return self._invoke_with_rollback(prompt, parser, {
                 "target_rating": target_rating,
                 "samples_text": samples_text,
                 "generated_review": generated_review_text,
                 "persona": self.persona,
-                "characteristics_text": characteristics_text
+                "characteristics_text": self._characteristics_text()
             })
-            return result
         except Exception as e:
-            print(f"❌ Judgment Error with primary model: {e}")
-            if self.rollback_llm:
-                print(f"🔄 Attempting rollback with model: {self.rollback_model}")
-                try:
-                    chain_rollback = prompt | self.rollback_llm | parser
-                    result = chain_rollback.invoke({
-                        "target_rating": target_rating,
-                        "samples_text": samples_text,
-                        "generated_review": generated_review_text,
-                        "persona": self.persona,
-                        "characteristics_text": characteristics_text
-                    })
-                    return result
-                except Exception as rollback_e:
-                     print(f"❌ Rollback Judgment failed: {rollback_e}")
-                     return {"verdict": "ERROR", "reason": str(rollback_e)}
-            
             return {"verdict": "ERROR", "reason": str(e)}
 
+    def evaluate_batch(self, generated_review_texts, target_rating):
+        """
+        Evaluates several review texts in one prompt, sharing the ground-truth samples and rubric.
+        Returns one verdict per input text, in order. Reviews missing from a malformed reply
+        fall back to evaluate_single_review; if the call itself fails (429, 5xx, timeout), every
+        review gets an ERROR verdict.
+        """
+        samples_text = self._sample_ground_truth(target_rating, key="\n".join(generated_review_texts))
+        if samples_text is None:
+            return [{"verdict": "UNKNOWN", "reason": "No ground truth matches found."} for _ in generated_review_texts]
+
+        reviews_text = ""
+        for i, text in enumerate(generated_review_texts):
+            reviews_text += f"[Generated Review {i}]\n{text}\n"
+            reviews_text += "-" * 20 + "\n"
+
+        parser = JsonOutputParser(pydantic_object=ReviewVerdictList)
+
+        template = """
+        You are {persona}. 
+        Your task is to determine, for EACH of the {count} "Generated Reviews" below, if it looks and sounds like a REAL user review for Visual Studio Code.
+        Judge every review independently.
+        
+        Target Rating: {target_rating}
+        
+        {characteristics_text}
+
+        REFERENCE REVIEWS (Ground Truth):
+        {samples_text}
+
+        GENERATED REVIEWS TO EVALUATE (numbered 0 to {last_index}):
+        {generated_reviews}
+
+        {criteria}
+
+        Return exactly one verdict per generated review, with "index" set to the review's number.
+        Response must be in JSON format:
+        {format_instructions}
+        """
+
+        prompt = PromptTemplate(
+            input_variables=["count", "last_index", "target_rating", "samples_text", "generated_reviews", "characteristics_text"],
+            template=template,
+            partial_variables={"format_instructions": parser.get_format_instructions(), "criteria": QUALITY_CRITERIA}
+        )
+
+        by_index = {}
+        try:
+            result = self._invoke_with_rollback(prompt, parser, {
+                "count": len(generated_review_texts),
+                "last_index": len(generated_review_texts) - 1,
+                "target_rating": target_rating,
+                "samples_text": samples_text,
+                "generated_reviews": reviews_text,
+                "persona": self.persona,
+                "characteristics_text": self._characteristics_text()
+            })
+            for item in (result or {}).get("verdicts", []) or []:
+                if isinstance(item, dict) and isinstance(item.get("index"), int) and "verdict" in item:
+                    verdict = dict(item)
+                    by_index.setdefault(verdict.pop("index"), verdict)
+        except Exception as e:
+            if is_retryable(e):
+                # The call itself failed after the policy's retries (and rollback); judging each
+                # review separately would only multiply the load on a struggling provider
+                print(f"⚠️ Batch judgment failed: {e}")
+                return [{"verdict": "ERROR", "reason": str(e)} for _ in generated_review_texts]
+            print(f"⚠️ Batch reply could not be parsed, falling back to per-review judging: {e}")
+
+        verdicts = []
+        missing = 0
+        for i, text in enumerate(generated_review_texts):
+            if i in by_index:
+                verdicts.append(by_index[i])
+            else:
+                missing += 1
+                verdicts.append(self.evaluate_single_review(text, target_rating))
+        if by_index and missing:
+            print(f"⚠️ Batch reply was missing {missing}/{len(generated_review_texts)} verdicts; judged them individually.")
+        return verdicts
+
 if __name__ == "__main__":
     try:
         judge = ReviewJudge()
@@ -1,9 +1,27 @@
-from .base_agent import BaseAgent
-from .ReviewGenerator import ReviewGenerator
-from .ReviewJudge import ReviewJudge
+import importlib
+
+# Agents are imported on first access (PEP 562), so importing src.agents (e.g. for the
+# registry) does not pull in langchain until an agent is actually needed
+_EXPORTS = {
+    "BaseAgent": ".base_agent",
+    "ReviewGenerator": ".ReviewGenerator",
+    "ReviewJudge": ".ReviewJudge",
+}
 
 __all__ = [
     "BaseAgent",
     "ReviewGenerator",
     "ReviewJudge"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,29 +1,36 @@
 import os
+import time
+import queue
+import threading
+import itertools
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from src.utils import parse_rating, load_csv_data
+from src.utils.metrics import get_metrics
+from src.utils.resilience import get_resilience
+from src.utils.rate_limiter import estimate_tokens
+from . import registry
 
 load_dotenv()
 
 class BaseAgent:
-    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.7, csv_path="data/real_reviews_capterra.csv", rating_column="rating"):
+    def __init__(self, model="xiaomi/mimo-v2-flash:free", rollback_model=None, temperature=0.7, csv_path="data/real_reviews_capterra.csv", rating_column="rating", use_cache=False, seed=None, request_timeout=None):
         self.model = model
         self.rollback_model = rollback_model
         self.temperature = temperature
         self.rating_column = rating_column
-        self.df = load_csv_data(csv_path)
-
-        if self.rating_column in self.df.columns:
-            self.df[self.rating_column] = self.df[self.rating_column].apply(parse_rating)
-            self.df = self.df.dropna(subset=[self.rating_column])
-        else:
-            raise ValueError(f"❌ Error: '{self.rating_column}' column not found in CSV file.")
-        
-        if self.df.empty:
-            raise ValueError("❌ Error: DataFrame is empty.")
+        # Whether calls may be served from / stored in the shared LLM response cache
+        # (which only takes temperature 0 calls unless llm_cache.allow_sampled is set)
+        self.use_cache = use_cache
+        cache = registry.get_llm_cache()
+        if use_cache and cache is not None and not cache.accepts(temperature):
+            print(f"⚠️ {type(self).__name__} runs at temperature {temperature}; its responses will not be cached.")
+        # Parsed once per process and shared between agents (see registry.py)
+        self.df = registry.get_corpus(csv_path, self.rating_column)
+        # Pre-rendered real reviews grouped by rating, for few-shot prompts
+        self.few_shot = registry.get_few_shot_store(csv_path, self.rating_column, seed=seed)
 
         api_key = os.getenv("OPENAI_API_KEY")
-        base_url = None
+        # Any OpenAI-compatible endpoint (e.g. the local stub server used by benchmarks/)
+        base_url = os.getenv("OPENAI_BASE_URL") or None
         
         if not api_key:
             api_key = os.getenv("OPENROUTER_API_KEY")
@@ -35,18 +42,173 @@ class BaseAgent:
                 self.llm = None
                 return
 
-        self.llm = ChatOpenAI(
-            model=self.model, 
-            temperature=self.temperature, 
-            api_key=api_key,
-            base_url=base_url
-        )
+        # Seconds per HTTP request; a timed-out request fails (and is retried) instead of holding its slot
+        self.request_timeout = request_timeout
+        self.llm = registry.get_llm(self.model, self.temperature, api_key, base_url, timeout=request_timeout)
 
         self.rollback_llm = None
         if hasattr(self, 'rollback_model') and self.rollback_model:
-             self.rollback_llm = ChatOpenAI(
-                model=self.rollback_model,
-                temperature=self.temperature,
-                api_key=api_key,
-                base_url=base_url
-            )
+             self.rollback_llm = registry.get_llm(self.rollback_model, self.temperature, api_key, base_url, timeout=request_timeout)
+
+    def _record_llm_call(self, llm, inputs, start, usage=None, cache_hit=False, error=None, streamed=False, retry=False, queue_wait=0.0):
+        usage = usage or {}
+        get_metrics().record(
+            "llm",
+            agent=type(self).__name__,
+            model=getattr(llm, "model_name", None),
+            rating=inputs.get("target_rating"),
+            duration_s=time.perf_counter() - start,
+            prompt_tokens=usage.get("input_tokens"),
+            completion_tokens=usage.get("output_tokens"),
+            rollback=llm is not None and llm is self.rollback_llm,
+            cache_hit=cache_hit,
+            streamed=streamed,
+            retry=retry,
+            queue_wait_s=queue_wait,
+            error=str(error) if error else None
+        )
+
+    @staticmethod
+    def _acquire_rate_limit(llm, prompt_value):
+        """Waits for the model's shared RPM/TPM budget. Returns (limiter, estimated_tokens, seconds_waited)."""
+        limiter = registry.get_rate_limiter(getattr(llm, "model_name", None))
+        if limiter is None:
+            return None, 0, 0.0
+        estimate = estimate_tokens(prompt_value.to_string())
+        return limiter, estimate, limiter.acquire(estimate)
+
+    @staticmethod
+    def _settle_rate_limit(limiter, estimate, usage):
+        if limiter is not None and usage:
+            limiter.settle(estimate, usage.get("total_tokens") or 0)
+
+    def invoke_chain(self, prompt, llm, parser, inputs, retry=False):
+        """
+        Single entry point for every LLM call made by the agents (prompt | llm | parser).
+        Serves repeated prompts from the shared response cache when use_cache is set,
+        respects the global LLM concurrency cap configured in the registry, and records
+        latency/token usage for the metrics report.
+        """
+        start = time.perf_counter()
+        prompt_value = prompt.invoke(inputs)
+
+        cache = registry.get_llm_cache() if self.use_cache else None
+        if cache is not None and not cache.accepts(getattr(llm, "temperature", None)):
+            cache = None
+        key = None
+        if cache is not None:
+            schema_model = getattr(parser, "pydantic_object", None)
+            schema = schema_model.model_json_schema() if schema_model is not None else None
+            key = cache.make_key(getattr(llm, "model_name", None), getattr(llm, "temperature", None), prompt_value.to_string(), schema)
+            cached = cache.get(key)
+            if cached is not None:
+                self._record_llm_call(llm, inputs, start, cache_hit=True)
+                return cached
+
+        message = None
+        limiter, estimate, queue_wait = self._acquire_rate_limit(llm, prompt_value)
+        try:
+            with registry.llm_slot():
+                message = llm.invoke(prompt_value)
+            result = parser.invoke(message)
+        except Exception as e:
+            self._record_llm_call(llm, inputs, start, usage=getattr(message, "usage_metadata", None), error=e, retry=retry, queue_wait=queue_wait)
+            raise
+        finally:
+            self._settle_rate_limit(limiter, estimate, getattr(message, "usage_metadata", None))
+        self._record_llm_call(llm, inputs, start, usage=getattr(message, "usage_metadata", None), retry=retry, queue_wait=queue_wait)
+
+        if cache is not None:
+            cache.set(key, result)
+        return result
+
+    def invoke_resilient(self, prompt, parser, inputs):
+        """
+        invoke_chain with the shared resilience policy: backoff on 429/5xx, the rollback model
+        while the primary's circuit is open (or once it fails), and optional hedging. Raises on failure.
+        """
+        return self.invoke_resilient_with_model(prompt, parser, inputs)[1]
+
+    def invoke_resilient_with_model(self, prompt, parser, inputs):
+        """invoke_resilient, returning (model_name, result) with the model that actually answered."""
+        policy = get_resilience()
+
+        def attempt(llm, model):
+            return lambda: (model, policy.call_with_retries(
+                model, lambda i: self.invoke_chain(prompt, llm, parser, inputs, retry=i > 0)))
+
+        rollback = attempt(self.rollback_llm, self.rollback_model) if self.rollback_llm else None
+        return policy.call(self.model, attempt(self.llm, self.model), self.rollback_model, rollback)
+
+    def stream_resilient(self, prompt, parser, inputs):
+        """
+        stream_chain with the same resilience policy as invoke_resilient. Opening the stream (up to
+        its first chunk) is retried with backoff and falls back to the rollback model once the retries
+        are exhausted or while the primary's circuit is open. Errors after the first chunk are raised
+        to the caller, which has already consumed part of the stream. Never hedged: a discarded stream
+        would keep its concurrency slot until it ends.
+        Returns (model_name, chunks).
+        """
+        policy = get_resilience()
+
+        def attempt(llm, model):
+            def open_stream(i):
+                stream = self.stream_chain(prompt, llm, parser, inputs, retry=i > 0)
+                for first in stream:
+                    return model, itertools.chain([first], stream)
+                return model, iter(())
+            return lambda: policy.call_with_retries(model, open_stream, record_latency=False)
+
+        rollback = attempt(self.rollback_llm, self.rollback_model) if self.rollback_llm else None
+        return policy.call(self.model, attempt(self.llm, self.model), self.rollback_model, rollback, hedge=False)
+
+    def stream_chain(self, prompt, llm, parser, inputs, retry=False):
+        """
+        Streams the parsed (partial) output of prompt | llm | parser. Not cached.
+        The LLM stream is drained by a producer thread that holds a global concurrency slot
+        only while reading from the network; the caller consumes the chunks without holding
+        one, so it may make further LLM calls (e.g. judge each review inline) without deadlocking.
+        """
+        start = time.perf_counter()
+        prompt_value = prompt.invoke(inputs)
+        usage = {}
+        items = queue.Queue()
+        done = object()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                with registry.llm_slot():
+                    for chunk in llm.stream(prompt_value):
+                        if stop.is_set():
+                            break
+                        items.put((chunk, None))
+            except Exception as e:
+                items.put((None, e))
+            finally:
+                items.put((done, None))
+
+        def chunks():
+            while True:
+                chunk, error = items.get()
+                if error is not None:
+                    raise error
+                if chunk is done:
+                    return
+                # Token usage (if the provider reports it) arrives on the last chunk
+                if getattr(chunk, "usage_metadata", None):
+                    usage.update(chunk.usage_metadata)
+                yield chunk
+
+        limiter, estimate, queue_wait = self._acquire_rate_limit(llm, prompt_value)
+        try:
+            threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+            yield from parser.transform(chunks())
+        except Exception as e:
+            self._record_llm_call(llm, inputs, start, usage=usage, error=e, streamed=True, retry=retry, queue_wait=queue_wait)
+            raise
+        finally:
+            # A consumer that stops early (or fails) lets the producer give up its slot at the next chunk
+            stop.set()
+            self._settle_rate_limit(limiter, estimate, usage)
+        self._record_llm_call(llm, inputs, start, usage=usage, streamed=True, retry=retry, queue_wait=queue_wait)
@@ -0,0 +1,199 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from src.utils import parse_rating, load_csv_data, LLMCache, FewShotStore
+from src.utils.rate_limiter import ModelRateLimiter
+
+# Process-wide caches. Agents, parsed corpora and LLM clients are built once per
+# configuration and shared by every graph node (and every thread) afterwards.
+_lock = threading.RLock()
+_agents = {}
+_corpora = {}
+_few_shot_stores = {}
+_corpus_indexes = {}
+_clients = {}
+_stats = Counter()
+# Global cap on LLM calls in flight across all agents, ratings and threads (None = unbounded)
+_llm_semaphore = None
+# Shared persistent LLM response cache (None = caching disabled)
+_llm_cache = None
+# Per-model RPM/TPM limits ({"default": {...}, "models": {name: {...}}}) and the limiters built from them
+_rate_limits = {}
+_rate_limiters = {}
+
+
+def _freeze(value):
+    """Turns nested dicts/lists into hashable tuples so they can be used as cache keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def get_corpus(csv_path, rating_column):
+    """
+    Returns the real-reviews DataFrame with the rating column parsed to float.
+    The CSV is read and parsed only once per (csv_path, rating_column).
+    """
+    key = (csv_path, rating_column)
+    with _lock:
+        if key in _corpora:
+            _stats["corpus_hits"] += 1
+            return _corpora[key]
+
+        df = load_csv_data(csv_path)
+        if rating_column in df.columns:
+            df[rating_column] = df[rating_column].apply(parse_rating)
+            df = df.dropna(subset=[rating_column])
+        else:
+            raise ValueError(f"❌ Error: '{rating_column}' column not found in CSV file.")
+
+        if df.empty:
+            raise ValueError("❌ Error: DataFrame is empty.")
+
+        _corpora[key] = df
+        _stats["corpus_builds"] += 1
+        return df
+
+
+def get_few_shot_store(csv_path, rating_column, seed=None):
+    """Returns the per-rating, pre-rendered few-shot store for the corpus, built once."""
+    key = (csv_path, rating_column, seed)
+    with _lock:
+        if key in _few_shot_stores:
+            return _few_shot_stores[key]
+
+        store = FewShotStore(get_corpus(csv_path, rating_column), rating_column=rating_column, seed=seed)
+        _few_shot_stores[key] = store
+        _stats["few_shot_builds"] += 1
+        return store
+
+
+def get_corpus_index(csv_path, rating_column, threshold=0.8):
+    """Returns the embedding index of every real review (for ground-truth leakage checks), built once."""
+    from src.utils.embedding_index import EmbeddingIndex, review_body
+    key = (csv_path, rating_column, threshold)
+    with _lock:
+        if key in _corpus_indexes:
+            return _corpus_indexes[key]
+
+        df = get_corpus(csv_path, rating_column)
+        index = EmbeddingIndex(threshold=threshold, capacity=max(1, len(df)))
+        index.add_many(review_body(row) for row in df.to_dict("records"))
+        _corpus_indexes[key] = index
+        _stats["corpus_index_builds"] += 1
+        return index
+
+
+def get_llm(model, temperature, api_key, base_url=None, timeout=None):
+    """
+    Returns a shared ChatOpenAI client so its HTTP connection pool is reused.
+    `timeout` bounds every HTTP request made by the client (None = the client default).
+    """
+    key = (model, temperature, api_key, base_url, timeout)
+    with _lock:
+        if key in _clients:
+            _stats["llm_hits"] += 1
+            return _clients[key]
+
+        # Deferred so the CLI starts without loading langchain/openai
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            # Retries/backoff are handled by src/utils/resilience.py so the circuit breaker sees every failure
+            max_retries=0
+        )
+        _clients[key] = llm
+        _stats["llm_builds"] += 1
+        return llm
+
+
+def get_agent(agent_cls, **kwargs):
+    """
+    Returns the agent instance for this class and configuration, building it on first use.
+    """
+    key = (agent_cls.__name__, _freeze(kwargs))
+    with _lock:
+        if key in _agents:
+            _stats["agent_hits"] += 1
+            return _agents[key]
+
+        agent = agent_cls(**kwargs)
+        _agents[key] = agent
+        _stats[f"agent_builds.{agent_cls.__name__}"] += 1
+        return agent
+
+
+def configure_llm_concurrency(max_in_flight):
+    """Sets the process-wide cap on concurrent LLM calls. None or <= 0 disables the cap."""
+    global _llm_semaphore
+    with _lock:
+        _llm_semaphore = threading.BoundedSemaphore(int(max_in_flight)) if max_in_flight and int(max_in_flight) > 0 else None
+
+
+@contextmanager
+def llm_slot():
+    """Holds one of the global LLM concurrency slots for the duration of a call."""
+    semaphore = _llm_semaphore
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def configure_rate_limits(default=None, models=None):
+    """
+    Sets the per-model requests/tokens-per-minute limits shared by every client of that model.
+    `default` applies to models without their own entry in `models`; None disables limiting.
+    """
+    global _rate_limits
+    with _lock:
+        _rate_limits = {"default": default or {}, "models": models or {}}
+        _rate_limiters.clear()
+
+
+def get_rate_limiter(model):
+    """Returns the shared ModelRateLimiter for a model, or None if it is not rate limited."""
+    with _lock:
+        if model not in _rate_limiters:
+            limits = _rate_limits.get("models", {}).get(model) or _rate_limits.get("default") or {}
+            rpm, tpm = limits.get("rpm"), limits.get("tpm")
+            _rate_limiters[model] = ModelRateLimiter(rpm, tpm) if rpm or tpm else None
+        return _rate_limiters[model]
+
+
+def configure_llm_cache(enabled=True, path="data/.cache/llm_cache.sqlite", max_entries=50000, ttl_seconds=7 * 24 * 3600, allow_sampled=False):
+    """Opens (or disables) the process-wide LLM response cache (temperature 0 calls only unless allow_sampled)."""
+    global _llm_cache
+    with _lock:
+        _llm_cache = LLMCache(path=path, max_entries=max_entries, ttl_seconds=ttl_seconds, allow_sampled=allow_sampled) if enabled else None
+        return _llm_cache
+
+
+def get_llm_cache():
+    """Returns the shared LLM response cache, or None if caching is disabled."""
+    return _llm_cache
+
+
+def get_stats():
+    """Returns a snapshot of construction/hit counters for agents, corpora and LLM clients."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset():
+    """Drops every cached agent, corpus and client (mainly useful for benchmarks)."""
+    with _lock:
+        _agents.clear()
+        _corpora.clear()
+        _few_shot_stores.clear()
+        _corpus_indexes.clear()
+        _clients.clear()
+        _rate_limiters.clear()
+        _stats.clear()
@@ -0,0 +1,101 @@
+import os
+import csv
+import json
+import math
+import hashlib
+import pandas as pd
+
+COLUMNS = ["tool", "source", "general", "pros", "cons", "rating"]
+TEXT_FIELDS = ("general", "pros", "cons")
+
+
+def _clean(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return " ".join(str(value).split())
+
+
+def review_fingerprint(row):
+    """Content hash of general + pros + cons (missing/NaN fields count as empty, whitespace is normalised)."""
+    key = "\x1f".join(_clean(row.get(field)) for field in TEXT_FIELDS)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ScrapedReviewSink:
+    """
+    Incremental CSV writer for scraped reviews. Every page is appended and flushed as soon as
+    it is scraped, duplicates are dropped with a set of content fingerprints (seeded from the
+    existing file, so it dedups across pages and runs), and the last page written (number and
+    URL) is recorded in `<output_file>.progress.json` so an interrupted scrape can resume after it.
+    With append=False an existing output (and its progress) is replaced.
+    """
+
+    def __init__(self, output_file, append=True):
+        self.output_file = output_file
+        self.progress_file = output_file + ".progress.json"
+        self.rows_written = 0
+        self.duplicates = 0
+        self._seen = set()
+        self._progress = {"last_page": 0, "url": None, "complete": False}
+
+        if not append:
+            for path in (self.output_file, self.progress_file):
+                if os.path.exists(path):
+                    os.remove(path)
+        if os.path.exists(self.output_file) and os.path.getsize(self.output_file) > 0:
+            existing = pd.read_csv(self.output_file, encoding="utf-8-sig")
+            self._seen.update(review_fingerprint(row) for row in existing.to_dict("records"))
+            print(f"🗂️ Loaded {len(self._seen)} existing review fingerprints from '{self.output_file}'")
+        if os.path.exists(self.progress_file):
+            with open(self.progress_file, "r", encoding="utf-8") as f:
+                self._progress.update(json.load(f))
+
+    @property
+    def last_page(self):
+        """Last page written by an unfinished earlier run (0 if there is nothing to resume)."""
+        return 0 if self._progress.get("complete") else int(self._progress.get("last_page") or 0)
+
+    @property
+    def resume_url(self):
+        """URL of the last page written by an unfinished earlier run, if it was recorded."""
+        return self._progress.get("url") if self.last_page else None
+
+    def write_page(self, rows, page_number, url=None):
+        """Appends the page's new reviews and records the page as done. Returns the number written."""
+        new_rows = []
+        for row in rows:
+            fingerprint = review_fingerprint(row)
+            if fingerprint in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(fingerprint)
+            new_rows.append(row)
+
+        if new_rows:
+            directory = os.path.dirname(self.output_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            new_file = not os.path.exists(self.output_file) or os.path.getsize(self.output_file) == 0
+            # utf-8-sig (for Excel) only on the first write; a BOM in the middle of the file would corrupt it
+            with open(self.output_file, "a", encoding="utf-8-sig" if new_file else "utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(new_rows)
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows_written += len(new_rows)
+
+        self._save_progress(last_page=page_number, url=url, complete=False)
+        return len(new_rows)
+
+    def finish(self):
+        """Marks the scrape as complete, so the next run starts from the first page again."""
+        self._save_progress(complete=True)
+
+    def _save_progress(self, **updates):
+        self._progress.update(updates)
+        tmp_path = self.progress_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._progress, f)
+        os.replace(tmp_path, self.progress_file)
@@ -1,14 +1,73 @@
 import json
 import time
-import pandas as pd
 import html
 import traceback
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from src.collector.snapshots import save_snapshot
+from src.collector.review_sink import ScrapedReviewSink
+
+# One reviewer picture per review card; used to tell when a new page of reviews has rendered
+REVIEW_MARKER_XPATH = "//img[@data-testid='reviewer-profile-pic']"
+COUNT_XPATH_JS = "return document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;"
+# Installs a MutationObserver once per document and returns the milliseconds since the DOM last changed
+DOM_QUIET_MS_JS = r"""
+if (!window.__forgeObserver) {
+    window.__forgeLastMutation = performance.now();
+    window.__forgeObserver = new MutationObserver(() => { window.__forgeLastMutation = performance.now(); });
+    window.__forgeObserver.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+return performance.now() - window.__forgeLastMutation;
+"""
+
+# Extracts every card on the page in one round trip. Mirrors the XPath heuristics of
+# _extract_xpath (same card, rating, general, Pros and Cons selectors) and returns a JSON
+# string: [{"rating", "general", "pros", "cons"}, ...].
+EXTRACT_REVIEWS_JS = r"""
+const xpathAll = (expr, ctx) => {
+    const result = document.evaluate(expr, ctx || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const nodes = [];
+    for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+    return nodes;
+};
+const text = (el) => (el && el.innerText ? el.innerText.trim() : "");
+
+let cards = xpathAll("//div[descendant::img[@data-testid='reviewer-profile-pic']]");
+if (!cards.length) cards = xpathAll("//div[descendant::div[@data-testid='rating']]");
+
+const rows = cards.map((card) => {
+    let rating = "N/A";
+    const ratingEl = xpathAll(".//div[@data-testid='rating']//span[text()]", card)[0];
+    if (ratingEl) rating = text(ratingEl);
+
+    let general = "";
+    const generalEl = xpathAll(".//div[contains(@class, '!mt-4')]//p", card)[0];
+    if (generalEl) {
+        general = text(generalEl);
+    } else {
+        for (const p of card.getElementsByTagName("p")) {
+            const parentText = text(p.parentElement);
+            if (text(p).length > 20 && !parentText.includes("Pros") && !parentText.includes("Cons")) {
+                general = text(p);
+                break;
+            }
+        }
+    }
+
+    const section = (label) => text(xpathAll(
+        ".//span[contains(., '" + label + "')]/following-sibling::p | .//span[contains(., '" + label + "')]/../p", card)[0]);
+    return {rating: rating, general: general, pros: section("Pros"), cons: section("Cons")};
+});
+return JSON.stringify(rows);
+"""
 
 
 class CapterraScraper:
-    def __init__(self, browser_executable_path):
+    def __init__(self, browser_executable_path, bulk_extract=True, snapshot_dir=None, capture_only=False,
+                 page_timeout=20, settle_ms=500, settle_timeout=10):
         if browser_executable_path is None:
             print("❌ No browser executable path provided. Please provide a path to the browser executable.")
             exit(1)
@@ -26,12 +85,40 @@ class CapterraScraper:
             exit(1)
 
         print("✅ Browser Initialized!")
-        self.data = []
+        # One execute_script per page instead of several WebDriver calls per card
+        self.bulk_extract = bulk_extract
+        # Save every page's HTML (gzip) so it can be re-parsed offline (see snapshots.py);
+        # with capture_only, pages are only saved, not extracted
+        self.snapshot_dir = snapshot_dir
+        self.capture_only = capture_only and snapshot_dir is not None
+        # Seconds to wait for the next page of reviews to replace the current one
+        self.page_timeout = page_timeout
+        # The DOM counts as settled once it has not changed for settle_ms (given up after settle_timeout seconds)
+        self.settle_ms = settle_ms
+        self.settle_timeout = settle_timeout
 
-    def run(self, target_url, output_file, max_pages=15):
+    def run(self, target_url, output_file, max_pages=15, resume=True):
+        """
+        Scrapes up to max_pages pages, appending each page to output_file as soon as it is
+        scraped (see review_sink.py). With resume, an interrupted run reopens the URL of the last
+        page it wrote and continues after it, and reviews already in output_file are skipped;
+        otherwise output_file is replaced.
+        """
+        sink = ScrapedReviewSink(output_file, append=resume)
         try:
-            print(f"🔗 Navigating to: {target_url}")
-            self.driver.get(target_url)
+            # Resume straight from the last page written if its URL identifies it; a paginator that
+            # keeps the same URL for every page falls back to clicking through from the first page
+            resume_url = sink.resume_url if sink.resume_url != target_url else None
+            start_url = resume_url or target_url
+            print(f"🔗 Navigating to: {start_url}")
+            try:
+                self.driver.get(start_url)
+            except Exception as e:
+                if not resume_url:
+                    raise
+                print(f"⚠️ Could not open {resume_url} ({e}); clicking through from the first page instead.")
+                resume_url = None
+                self.driver.get(target_url)
 
             print("\n" + "!"*60)
             print("🛑 ACTION REQUIRED: Check the Chrome window!")
@@ -41,23 +128,46 @@ class CapterraScraper:
             input("👉 Once the page is fully loaded, press ENTER here to scrape... ")
 
             page_number = 1
+            if sink.last_page:
+                print(f"♻️ Resuming after page {sink.last_page}...")
+                if resume_url:
+                    page_number = sink.last_page
+                while page_number <= sink.last_page:
+                    if not self.go_to_next_page():
+                        print("🛑 Could not reach the page to resume from.")
+                        return
+                    page_number += 1
 
-            while page_number <= max_pages:
+            # max_pages=None scrapes until there is no 'Next' page
+            while max_pages is None or page_number <= max_pages:
                 print(f"\n--- Scraping Page {page_number} ---")
                 
-                # Scroll down to ensure dynamic content loads
+                # Scroll down to ensure dynamic content loads, then wait for it to finish rendering
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                self.wait_until_settled()
                 
-                self.scrape_current_page()
+                if self.snapshot_dir:
+                    path = save_snapshot(self.driver.page_source, self.snapshot_dir, page_number)
+                    print(f"📸 Saved snapshot to {path}")
+                rows = [] if self.capture_only else self.scrape_current_page()
+                # Flushed right away, so a crash later on loses nothing already scraped
+                written = sink.write_page(rows, page_number, url=self.driver.current_url)
+                if rows:
+                    print(f"💾 Saved {written} new reviews ({len(rows) - written} duplicates skipped).")
                 # Try to go to the next page
                 if not self.go_to_next_page():
                     print("🛑 No more pages found or reached end.")
                     break
                 
                 page_number += 1
-                time.sleep(2)
 
-            self.save(output_file)
+            sink.finish()
+            if self.capture_only:
+                print(f"\n✅ Snapshots saved to '{self.snapshot_dir}'. Extract them with: python -m src.collector.snapshots {self.snapshot_dir}")
+            elif sink.rows_written:
+                print(f"\n✅ SUCCESS: Saved {sink.rows_written} new reviews to '{output_file}' ({sink.duplicates} duplicates skipped)")
+            else:
+                print("❌ No new data found. Did Cloudflare block the page?")
 
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -74,7 +184,42 @@ class CapterraScraper:
 
 
     def scrape_current_page(self):
+        """Returns the reviews on the current page."""
+        start = time.time()
+        rows = self._extract_bulk() if self.bulk_extract else None
+        if rows is None:
+            rows = self._extract_xpath()
+
+        reviews = []
+        for row in rows:
+            # Only add if we found *something*
+            if row["general"] or row["pros"] or row["cons"]:
+                reviews.append({
+                    "tool": "VS Code",
+                    "source": "Capterra",
+                    "general": row["general"],
+                    "pros": row["pros"],
+                    "cons": row["cons"],
+                    "rating": row["rating"]
+                })
+        print(f"   > Extracted {len(reviews)} reviews in {time.time() - start:.2f}s.")
+        return reviews
+
+    def _extract_bulk(self):
+        """All cards in a single in-page JavaScript pass. Returns None if the script fails."""
+        print("🔍 Extracting review cards (single JavaScript pass)...")
+        try:
+            rows = json.loads(self.driver.execute_script(EXTRACT_REVIEWS_JS) or "[]")
+        except Exception as e:
+            print(f"⚠️ Bulk extraction failed, falling back to per-card XPath: {e}")
+            return None
+        print(f"   > Found {len(rows)} review cards.")
+        return rows
+
+    def _extract_xpath(self):
+        """Per-card WebDriver lookups (several round trips per card); fallback for _extract_bulk."""
         print("🔍 Scanning for review cards (DOM-based)...")
+        rows = []
         
         # Strategy: Find cards by looking for the Reviewer Profile Picture which is a consistent anchor
         cards = self.driver.find_elements(By.XPATH, "//div[descendant::img[@data-testid='reviewer-profile-pic']]")
@@ -115,8 +260,10 @@ class CapterraScraper:
                         for p in all_ps:
                             # Heuristic: General comments are usually the first ones and plain text
                             txt = p.text.strip()
-                            if len(txt) > 20 and "Pros" not in p.xpath("..").get_attribute("innerText") \
-                                             and "Cons" not in p.xpath("..").get_attribute("innerText"):
+                            if len(txt) <= 20:
+                                continue
+                            parent_text = p.find_element(By.XPATH, "..").get_attribute("innerText") or ""
+                            if "Pros" not in parent_text and "Cons" not in parent_text:
                                 general_text = txt
                                 break
                 except Exception as e:
@@ -142,23 +289,59 @@ class CapterraScraper:
                         cons_text = cons_el[0].text.strip()
                 except: pass
 
-                # Only add if we found *something*
-                if general_text or pros_text or cons_text:
-                    self.data.append({
-                        "tool": "VS Code",
-                        "source": "Capterra",
-                        "general": general_text,
-                        "pros": pros_text,
-                        "cons": cons_text,
-                        "rating": rating
-                    })
-                    
+                rows.append({"rating": rating, "general": general_text, "pros": pros_text, "cons": cons_text})
+
             except Exception as e:
                 print(f"⚠️ Error parsing a card: {e}")
                 continue
+        return rows
+
+    def _review_count(self):
+        return self.driver.execute_script(COUNT_XPATH_JS, REVIEW_MARKER_XPATH)
+
+    def _page_marker(self):
+        """What the current page looks like: (first review element, review count, URL)."""
+        markers = self.driver.find_elements(By.XPATH, REVIEW_MARKER_XPATH)
+        return (markers[0] if markers else None), len(markers), self.driver.current_url
+
+    def wait_until_settled(self):
+        """Waits until the MutationObserver has seen no DOM change for settle_ms. Returns False on timeout."""
+        try:
+            WebDriverWait(self.driver, self.settle_timeout, poll_frequency=0.1).until(
+                lambda d: (d.execute_script(DOM_QUIET_MS_JS) or 0) >= self.settle_ms)
+            return True
+        except TimeoutException:
+            print(f"⚠️ Page still changing after {self.settle_timeout}s; continuing anyway.")
+            return False
+
+    def wait_for_next_page(self, marker):
+        """
+        Waits until the page differs from `marker` (URL changed, first review went stale, or the
+        review count changed), then until reviews are present and the DOM has settled.
+        """
+        first_review, count, url = marker
+
+        def page_changed(driver):
+            if driver.current_url != url:
+                return True
+            if first_review is not None and EC.staleness_of(first_review)(driver):
+                return True
+            return self._review_count() != count
+
+        try:
+            WebDriverWait(self.driver, self.page_timeout, poll_frequency=0.1).until(page_changed)
+            WebDriverWait(self.driver, self.page_timeout, poll_frequency=0.1).until(lambda d: self._review_count() > 0)
+        except TimeoutException:
+            print(f"⚠️ No new reviews appeared within {self.page_timeout}s.")
+            return False
+        self.wait_until_settled()
+        return True
 
     def go_to_next_page(self):
+        """Clicks 'Next' and waits for the next page of reviews. Returns False if there is none."""
         try:
+            marker = self._page_marker()
+
             # Selector based on user provided HTML:
             # Look for the 'chevron-right' icon which indicates the Next button
             # <i role="img" aria-label="chevron-right" ...>
@@ -171,19 +354,18 @@ class CapterraScraper:
                 
                 # Scroll into view just in case
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", btn)
-                time.sleep(1)
                 
                 # Javascript click is often more reliable for obscurely covered elements
                 # We try clicking the icon, effectively clicking the parent anchor
                 self.driver.execute_script("arguments[0].click();", btn)
-                return True
+                return self.wait_for_next_page(marker)
             
             # Fallback: Check for traditional "Next" text just in case layout changes
             print("⚠️ Chevron not found. Checking for 'Next' text...")
             fallback_btns = self.driver.find_elements(By.XPATH, "//button[contains(., 'Next')] | //a[contains(., 'Next')]")
             if fallback_btns:
                 self.driver.execute_script("arguments[0].click();", fallback_btns[-1])
-                return True
+                return self.wait_for_next_page(marker)
 
             print("🚫 'Next' button not found.")
             return False
@@ -192,25 +374,6 @@ class CapterraScraper:
             print(f"⚠️ Failed to go to next page: {e}")
             return False
 
-    def save(self, output_file):
-        if not self.data:
-            print("❌ No data found. Did Cloudflare block the page?")
-            return
-
-        df = pd.DataFrame(self.data)
-        
-        # Remove duplicates based on the content (combination of reviews)
-        # using a lambda to handle potentially empty fields
-        df['combined_key'] = df['general'] + df['pros'] + df['cons']
-        df.drop_duplicates(subset=['combined_key'], inplace=True)
-        df.drop(columns=['combined_key'], inplace=True)
-        
-        # Save to CSV
-        df.to_csv(output_file, index=False, encoding='utf-8-sig') # utf-8-sig for Excel compatibility
-        print(f"\n✅ SUCCESS: Saved {len(df)} reviews to '{output_file}'")
-        if not df.empty:
-            print(df[['rating', 'general', 'pros', 'cons']].head())
-
 if __name__ == "__main__":
     browser_executable_path = r"C:\Users\aly17\Downloads\chrome-win64\chrome-win64\chrome.exe"
     TARGET_URL = "https://www.capterra.com/p/186634/Visual-Studio-Code/reviews/"
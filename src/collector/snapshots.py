@@ -0,0 +1,143 @@
+import os
+import re
+import gzip
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from src.collector.review_sink import ScrapedReviewSink
+
+# Same selectors as CapterraScraper._extract_xpath, evaluated with lxml instead of WebDriver
+CARD_XPATHS = [
+    "//div[descendant::img[@data-testid='reviewer-profile-pic']]",
+    "//div[descendant::div[@data-testid='rating']]",
+]
+RATING_XPATH = ".//div[@data-testid='rating']//span[text()]"
+GENERAL_XPATH = ".//div[contains(@class, '!mt-4')]//p"
+SECTION_XPATH = ".//span[contains(., '{label}')]/following-sibling::p | .//span[contains(., '{label}')]/../p"
+
+_PAGE_NUMBER = re.compile(r"page-(\d+)\.html\.gz$")
+
+
+def snapshot_path(directory, page_number):
+    return os.path.join(directory, f"page-{page_number:04d}.html.gz")
+
+
+def save_snapshot(html, directory, page_number):
+    """Writes one page's HTML gzip-compressed (via a temporary file, so a crash never leaves half a page)."""
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, page_number)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    return path
+
+
+def page_number(path):
+    match = _PAGE_NUMBER.search(path)
+    return int(match.group(1)) if match else None
+
+
+def list_snapshots(directory):
+    """Snapshot files in page order."""
+    if not os.path.isdir(directory):
+        return []
+    pages = [(page_number(name), os.path.join(directory, name)) for name in os.listdir(directory)]
+    return [path for _, path in sorted(p for p in pages if p[0] is not None)]
+
+
+def _text(element):
+    return element.text_content().strip() if element is not None else ""
+
+
+def _first(card, xpath):
+    found = card.xpath(xpath)
+    return found[0] if found else None
+
+
+def parse_html(html):
+    """Extracts {"tool", "source", "general", "pros", "cons", "rating"} rows from one page. Requires lxml."""
+    try:
+        import lxml.html
+    except ImportError as e:
+        raise ImportError("Offline snapshot parsing requires lxml (pip install lxml)") from e
+
+    tree = lxml.html.fromstring(html)
+    cards = []
+    for xpath in CARD_XPATHS:
+        cards = tree.xpath(xpath)
+        if cards:
+            break
+
+    rows = []
+    for card in cards:
+        rating_el = _first(card, RATING_XPATH)
+        rating = _text(rating_el) if rating_el is not None else "N/A"
+
+        general_el = _first(card, GENERAL_XPATH)
+        general_text = _text(general_el)
+        if general_el is None:
+            for p in card.iter("p"):
+                parent_text = _text(p.getparent())
+                if len(_text(p)) > 20 and "Pros" not in parent_text and "Cons" not in parent_text:
+                    general_text = _text(p)
+                    break
+
+        pros_text = _text(_first(card, SECTION_XPATH.format(label="Pros")))
+        cons_text = _text(_first(card, SECTION_XPATH.format(label="Cons")))
+
+        # Only add if we found *something*
+        if general_text or pros_text or cons_text:
+            rows.append({
+                "tool": "VS Code",
+                "source": "Capterra",
+                "general": general_text,
+                "pros": pros_text,
+                "cons": cons_text,
+                "rating": rating
+            })
+    return rows
+
+
+def parse_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return parse_html(f.read())
+
+
+def parse_snapshots(paths, workers=None):
+    """Parses snapshot files across a process pool; returns one list of rows per snapshot, in input order."""
+    paths = list(paths)
+    if workers == 1 or len(paths) <= 1:
+        return [parse_snapshot(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(paths) // (4 * (workers or os.cpu_count() or 1)))
+        return list(executor.map(parse_snapshot, paths, chunksize=chunksize))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract Capterra reviews from saved page snapshots.")
+    parser.add_argument("snapshot_dir", help="Directory written by CapterraScraper(snapshot_dir=...)")
+    parser.add_argument("-o", "--output", default="data/real_reviews_capterra.csv", help="CSV to write")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    paths = list_snapshots(args.snapshot_dir)
+    if not paths:
+        print(f"❌ No snapshots found in '{args.snapshot_dir}'.")
+        return
+
+    start = time.time()
+    pages = parse_snapshots(paths, workers=args.workers)
+    # Re-extraction replaces the output; duplicates are dropped the same way as during a live scrape
+    sink = ScrapedReviewSink(args.output, append=False)
+    for path, rows in zip(paths, pages):
+        sink.write_page(rows, page_number(path))
+    sink.finish()
+    if not sink.rows_written:
+        print("❌ No reviews found in the snapshots.")
+        return
+    print(f"✅ Parsed {len(paths)} snapshots in {time.time() - start:.2f}s; saved {sink.rows_written} reviews to '{args.output}' ({sink.duplicates} duplicates skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,183 @@
 import os
+import sys
 import time
+import argparse
+import tempfile
+import subprocess
 import random
-import pandas as pd
-from langgraph.graph import StateGraph, END
-from src.agents import ReviewGenerator, ReviewJudge
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.agents import registry
 from src.utils.utils import load_config
+from src.utils.yield_planner import YieldPlanner
+from src.utils.metrics import configure_metrics, get_metrics, instrument_node
+from src.utils.resilience import configure_resilience
+from src.utils.run_state import RunTracker, open_checkpointer, count_existing
+from src.utils.sharding import shard_target, shard_path, find_shards, merge_shards, count_unmerged
+from src.utils.output_sink import open_sink, read_output, migrate_legacy_csv
+from src.utils.quality_stats import configure_quality_stats, get_quality_stats, corpus_baseline, review_snippet
 from src.Models.WorkflowState import WorkflowState
 
-config = load_config()
+# Filled by ensure_config() / apply_overrides(); nothing heavy runs at import time, so
+# `--help`, argument errors and shard worker processes start quickly
+config = {}
+
+_planner = None
+_planner_lock = threading.Lock()
+_prefilter = None
+_prefilter_lock = threading.Lock()
+# Real-corpus statistics for the report, computed on first use
+_baseline = None
+
+def ensure_config(path="config/default.yaml"):
+    """Loads the config into `config` in place unless it has been loaded already."""
+    if not config:
+        config.update(load_config(path))
+    return config
 
 def get_generator():
+    from src.agents import ReviewGenerator
+    # Built once per configuration and reused by every node invocation
     cfg = config.get("ReviewGenerator", {})
-    return ReviewGenerator(
+    return registry.get_agent(
+        ReviewGenerator,
         model=cfg.get("model", "xiaomi/mimo-v2-flash:free"),
         rollback_model=cfg.get("rollback_model", None),
         temperature=cfg.get("temperature", 0.7),
         csv_path=cfg.get("csv_path", "data/real_reviews_capterra.csv"),
         rating_column=cfg.get("rating_column", "rating"),
         persona=cfg.get("persona", "a Technical Reviewer"),
-        review_characteristics=config.get("review_characteristics", {})
+        review_characteristics=config.get("review_characteristics", {}),
+        use_cache=cfg.get("use_cache", False),
+        seed=config.get("seed", None)
     )
 
 def get_judge():
+    from src.agents import ReviewJudge
     cfg = config.get("ReviewJudge", {})
-    return ReviewJudge(
+    return registry.get_agent(
+        ReviewJudge,
         model=cfg.get("model", "xiaomi/mimo-v2-flash:free"),
         rollback_model=cfg.get("rollback_model", None),
         temperature=cfg.get("temperature", 0.0),
         csv_path=cfg.get("csv_path", "data/real_reviews_capterra.csv"),
         rating_column=cfg.get("rating_column", "rating"),
         persona=cfg.get("persona", "an expert Review Quality Judge"),
-        review_characteristics=config.get("review_characteristics", {})
+        review_characteristics=config.get("review_characteristics", {}),
+        max_concurrency=cfg.get("max_concurrency", 1),
+        call_timeout=cfg.get("call_timeout", None),
+        batch_size=cfg.get("batch_size", 1),
+        use_cache=cfg.get("use_cache", True),
+        similarity_threshold=cfg.get("similarity_threshold", 0.7),
+        semantic_threshold=cfg.get("semantic_threshold", 0.85),
+        semantic_history_size=cfg.get("semantic_history_size", 5000),
+        leakage_threshold=cfg.get("leakage_threshold", 0.8),
+        seed=config.get("seed", None)
     )
 
+def get_planner():
+    """Process-wide adaptive over-generation planner (observed yields persist between runs)."""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            cfg = config.get("yield_planner", {})
+            _planner = YieldPlanner(
+                path=cfg.get("path", "data/.cache/yield_stats.json"),
+                prior_yield=cfg.get("prior_yield", 0.7),
+                safety_margin=cfg.get("safety_margin", 0.2),
+                max_multiplier=cfg.get("max_multiplier", 3.0),
+                max_chunk_size=cfg.get("max_chunk_size", 10),
+                enabled=cfg.get("enabled", True)
+            )
+        return _planner
+
+def get_prefilter():
+    """Process-wide rule-based pre-judge filter (None when disabled); length bounds come from the judge's corpus."""
+    global _prefilter
+    cfg = config.get("prefilter", {})
+    if not cfg.get("enabled", True):
+        return None
+    with _prefilter_lock:
+        if _prefilter is None:
+            from src.utils.prefilter import ReviewPrefilter
+            judge_cfg = config.get("ReviewJudge", {})
+            rating_column = judge_cfg.get("rating_column", "rating")
+            _prefilter = ReviewPrefilter(
+                registry.get_corpus(judge_cfg.get("csv_path", "data/real_reviews_capterra.csv"), rating_column),
+                rating_column=rating_column,
+                lexicon=cfg.get("lexicon", None),
+                required_fields=cfg.get("required_fields", []),
+                length_quantiles=cfg.get("length_quantiles", [0.0, 1.0]),
+                length_tolerance=cfg.get("length_tolerance", 0.5),
+                min_samples=cfg.get("min_samples", 20)
+            )
+        return _prefilter
+
+def prefilter_savings():
+    """(reviews skipped by the prefilter, judge calls that saved at the configured batch_size)."""
+    prefilter = get_prefilter()
+    if prefilter is None:
+        return 0, 0.0
+    return prefilter.skipped, prefilter.calls_saved(config.get("ReviewJudge", {}).get("batch_size", 1))
+
+def _chunk_workers(sizes):
+    # No point in more chunk threads than LLM calls allowed in flight
+    return max(1, min(len(sizes), config.get("max_llm_concurrency") or len(sizes)))
+
+def generate_chunks(generator, target_rating, sizes):
+    """Generates one request per chunk size, in parallel, and returns all reviews."""
+    def generate(count):
+        result = generator.generate_reviews(target_rating=target_rating, count=count)
+        # Based on verify output: {'reviews': [...]}
+        return result.get('reviews', []) if result else []
+
+    if len(sizes) == 1:
+        return generate(sizes[0])
+
+    with ThreadPoolExecutor(max_workers=_chunk_workers(sizes)) as executor:
+        return [r for reviews in executor.map(generate, sizes) for r in reviews]
+
+def stream_chunks(generator, target_rating, sizes):
+    """Streams one request per chunk size in parallel, yielding reviews as each completes."""
+    if len(sizes) == 1:
+        yield from generator.stream_reviews(target_rating=target_rating, count=sizes[0])
+        return
+
+    reviews = queue.Queue()
+    done = object()
+
+    def produce(count):
+        try:
+            for r in generator.stream_reviews(target_rating=target_rating, count=count):
+                reviews.put(r)
+        finally:
+            reviews.put(done)
+
+    with ThreadPoolExecutor(max_workers=_chunk_workers(sizes)) as executor:
+        for count in sizes:
+            executor.submit(produce, count)
+        finished = 0
+        while finished < len(sizes):
+            item = reviews.get()
+            if item is done:
+                finished += 1
+            else:
+                yield item
+
 # --- Nodes ---
 
+def to_review_dict(r):
+    """Convert Pydantic models to dicts if they are objects."""
+    if hasattr(r, 'model_dump'):
+        return r.model_dump()
+    elif isinstance(r, dict):
+        return r
+    else:
+        # Fallback
+        return dict(r)
+
 def node_generate(state: WorkflowState):
     """
     Generates usage reviews.
@@ -47,25 +190,13 @@ def node_generate(state: WorkflowState):
     if needed <= 0:
         return {"current_generated_reviews": []}
 
-    print(f"\n🌀 [Generator] Generating {needed} reviews (Iteration {state.get('iteration', 1)})...")
-    
     generator = get_generator()
-    # ReviewGenerator.generate_reviews now returns distinct dict or list?
-    # Based on verify output: {'reviews': [...]}
-    result = generator.generate_reviews(target_rating=state["target_rating"], count=needed)
+    # Over-generate based on the observed yield, split into parallel chunks
+    sizes = get_planner().plan(state["target_rating"], generator.model, needed)
+    print(f"\n🌀 [Generator] Generating {sum(sizes)} reviews for {needed} needed in {len(sizes)} chunk(s) (Iteration {state.get('iteration', 1)})...")
     
-    reviews = result.get('reviews', []) if result else []
-    
-    # Convert Pydantic models to dicts if they are objects
-    cleaned_reviews = []
-    for r in reviews:
-        if hasattr(r, 'model_dump'):
-            cleaned_reviews.append(r.model_dump())
-        elif isinstance(r, dict):
-            cleaned_reviews.append(r)
-        else:
-             # Fallback
-            cleaned_reviews.append(dict(r))
+    reviews = generate_chunks(generator, state["target_rating"], sizes)
+    cleaned_reviews = [to_review_dict(r) for r in reviews]
 
     return {
         "current_generated_reviews": cleaned_reviews,
@@ -73,25 +204,89 @@ def node_generate(state: WorkflowState):
         "iteration": state.get("iteration", 0) + 1
     }
 
-def node_judge(state: WorkflowState):
+def node_prefilter(state: WorkflowState):
     """
-    Judges the currently generated reviews.
+    Rejects reviews that break a mechanical rule (forbidden phrases, empty pros/cons, length far
+    outside the real distribution) so they never cost a judge call.
     """
     reviews = state.get("current_generated_reviews", [])
+    prefilter = get_prefilter()
+    if prefilter is None or not reviews:
+        return {"current_candidates": reviews, "current_judgments": []}
+
+    candidates, rejected = prefilter.split(reviews, rating=state["target_rating"])
+    if rejected:
+        print(f"🧹 [Prefilter] Rejected {len(rejected)} of {len(reviews)} reviews before judging.")
+    return {"current_candidates": candidates, "current_judgments": rejected}
+
+def node_judge(state: WorkflowState):
+    """
+    Judges the currently generated reviews that passed the prefilter.
+    """
+    reviews = state.get("current_candidates", [])
+    prefiltered = state.get("current_judgments", [])
     if not reviews:
-        return {"current_judgments": []}
+        return {"current_judgments": prefiltered}
 
     print(f"⚖️ [Judge] Evaluating {len(reviews)} reviews...")
     judge = get_judge()
     judgments = judge.evaluate_reviews(reviews, target_rating=state["target_rating"])
     
-    return {"current_judgments": judgments}
+    return {"current_judgments": prefiltered + judgments}
+
+def node_generate_stream(state: WorkflowState):
+    """
+    Streaming variant of generate + judge.
+    Each review is handed to the judge as soon as it is complete in the LLM stream,
+    so judge calls overlap with the rest of the generation.
+    """
+    current_count = len(state.get("accepted_reviews", []))
+    needed = state["required_count"] - current_count
+
+    if needed <= 0:
+        return {"current_generated_reviews": [], "current_judgments": []}
+
+    generator = get_generator()
+    judge = get_judge()
+    prefilter = get_prefilter()
+    sizes = get_planner().plan(state["target_rating"], generator.model, needed)
+    print(f"\n🌀 [Generator→Judge] Streaming {sum(sizes)} reviews for {needed} needed in {len(sizes)} chunk(s) (Iteration {state.get('iteration', 1)})...")
+
+    start = time.time()
+    first_review_at = []
+    # The prefilter runs inline here: rejected reviews are never handed to the judge
+    prefiltered = []
+
+    def reviews():
+        for r in stream_chunks(generator, state["target_rating"], sizes):
+            if not first_review_at:
+                first_review_at.append(time.time() - start)
+            review = to_review_dict(r)
+            failure = prefilter.check(review, state["target_rating"]) if prefilter else None
+            if failure:
+                prefiltered.append({"review": review, "judgment": failure})
+                continue
+            yield review
+
+    judgments = judge.evaluate_stream(reviews(), target_rating=state["target_rating"]) + prefiltered
+    generated = [item["review"] for item in judgments]
+
+    if first_review_at:
+        print(f"⏱️ First review handed to judge after {first_review_at[0]:.2f}s; iteration took {time.time() - start:.2f}s.")
+
+    return {
+        "current_generated_reviews": generated,
+        "current_judgments": judgments,
+        "cumulative_generated": len(generated),
+        "iteration": state.get("iteration", 0) + 1
+    }
 
 def node_filter(state: WorkflowState):
     """
     Filters reviews that passed judgment and adds them to accepted_reviews.
     """
     judgments = state.get("current_judgments", [])
+    quality = get_quality_stats()
     passed = []
     
     for item in judgments:
@@ -101,17 +296,52 @@ def node_filter(state: WorkflowState):
             # Extract Quality Score
             quality_score = item.get("judgment", {}).get("quality_score", None)
             review["quality_score"] = quality_score
+            review["judge_reason"] = item.get("judgment", {}).get("reason")
+            # Tag with the target rating for tracking (the only place it is set)
+            review["generated_rating"] = state["target_rating"]
             passed.append(review)
         else:
             reason = item.get("judgment", {}).get("reason", "Unknown")
             print(f"   ❌ Rejected: {reason}")
+            quality.record_rejected(state["target_rating"], reason)
+
+    generated = state.get("current_generated_reviews", [])
+    quality.record_generated(state["target_rating"], len(generated))
+    # Credit each model with the reviews it wrote, so a rollback does not skew the primary's yield
+    primary = get_generator().model
+    generated_by = Counter(r.get("generator_model") or primary for r in generated)
+    passed_by = Counter(r.get("generator_model") or primary for r in passed)
+    for model, count in generated_by.items():
+        get_planner().record(state["target_rating"], model, count, passed_by[model])
+
+    # Register accepted reviews in the cross-batch near-duplicate index, one at a time until the
+    # rating reaches its target. This also catches near-identical reviews accepted concurrently
+    # by another rating pipeline, so a duplicate is replaced by a surplus review where possible.
+    remaining = state["required_count"] - len(state.get("accepted_reviews", []))
+    kept, surplus = [], 0
+    for review in passed:
+        if len(kept) >= remaining:
+            surplus += 1
+            continue
+        unique, duplicates = get_judge().remember([review])
+        kept += unique
+        for _, similarity in duplicates:
+            print(f"   ❌ Rejected: Diversity Check Failed: Review is {similarity:.2f} similar to a review accepted concurrently.")
+            quality.record_rejected(state["target_rating"], "Diversity Check Failed")
+    passed = kept
+    # Over-generation can overshoot; surplus passed judging, so it counts towards the yield, not as rejected
+    if surplus:
+        print(f"   ✂️ {surplus} accepted reviews over the target were not kept.")
+        quality.record_surplus(state["target_rating"], surplus)
+    quality.record_accepted(state["target_rating"], passed)
 
     print(f"✅ [Filter] Accepted {len(passed)} new reviews.")
-    return {"accepted_reviews": passed}
+    return {"accepted_reviews": passed, "cumulative_surplus": surplus}
 
 # --- Conditional Logic ---
 
 def should_continue(state: WorkflowState):
+    from langgraph.graph import END
     current_total = len(state.get("accepted_reviews", []))
     required = state["required_count"]
     
@@ -130,148 +360,214 @@ def should_continue(state: WorkflowState):
 
 # --- Build Graph ---
 
-def build_graph():
+def build_graph(streaming=False, checkpointer=None):
+    """
+    Compiles the generate -> prefilter -> judge -> filter loop. With a checkpointer, the state of every
+    rating thread is persisted after each node so an interrupted run can be resumed.
+    """
+    from langgraph.graph import StateGraph, END
     graph = StateGraph(WorkflowState)
     
-    graph.add_node("generate", node_generate)
-    graph.add_node("judge", node_judge)
-    graph.add_node("filter", node_filter)
+    # Every node records its wall time per rating (see src/utils/metrics.py)
+    if streaming:
+        # Generation and judging overlap inside a single node
+        graph.add_node("generate", instrument_node("generate+judge", node_generate_stream))
+    else:
+        graph.add_node("generate", instrument_node("generate", node_generate))
+        graph.add_node("prefilter", instrument_node("prefilter", node_prefilter))
+        graph.add_node("judge", instrument_node("judge", node_judge))
+    graph.add_node("filter", instrument_node("filter", node_filter))
     
     graph.set_entry_point("generate")
     
-    graph.add_edge("generate", "judge")
-    graph.add_edge("judge", "filter")
+    if streaming:
+        graph.add_edge("generate", "filter")
+    else:
+        graph.add_edge("generate", "prefilter")
+        graph.add_edge("prefilter", "judge")
+        graph.add_edge("judge", "filter")
     graph.add_conditional_edges("filter", should_continue, {
         "generate": "generate",
         END: END
     })
     
-    return graph.compile()
-
-if __name__ == "__main__":
-    # Interactive CLI
-    print("🚀 DevTools Review Forge - Agentic Workflow")
-    
-    try:
-        count_input = input("Total Number of Reviews Needed (Approx): ").strip()
-        total_count = int(count_input)
-        
-        # Get distribution or default to uniform
-        distribution = config.get("rating_distribution", [0.2, 0.2, 0.2, 0.2, 0.2])
-        if len(distribution) != 5:
-            print("⚠️ Warning: rating_distribution should have 5 values.Using default uniform.")
-            distribution = [0.2, 0.2, 0.2, 0.2, 0.2]
-            
-        print(f"📊 Target Distribution: {distribution}")
-        
-        app = build_graph()
-        
-        
-        start_time = time.time()
-        all_accepted = []
-        grand_total_generated = 0
+    return graph.compile(checkpointer=checkpointer)
 
-        for i, ratio in enumerate(distribution):
-            rating = float(i + 1)
-            target_count = int(total_count * ratio)
-            
-            if target_count <= 0:
-                continue
-                
-            print(f"\n" + "="*50)
-            print(f"🎯 Processing Rating {rating} (Target: {target_count} reviews)")
-            print("="*50)
-
-            initial_state = {
-                "target_rating": rating,
-                "required_count": target_count,
-                "accepted_reviews": [],
-                "current_generated_reviews": [],
-                "cumulative_generated": 0,
-                "current_judgments": [],
-                "iteration": 1
-            }
-            
-            final_state = app.invoke(initial_state, {"recursion_limit": 50})
-            accepted = final_state.get("accepted_reviews", [])
-            # Enrich reviews with the target rating for tracking
-            for rev in accepted:
-                rev['generated_rating'] = rating
-            
-            grand_total_generated += final_state.get("cumulative_generated", 0)
-            all_accepted.extend(accepted)
-            
-            # Save incrementally (append mode handled below)
-            if accepted:
-                df = pd.DataFrame(accepted)
-                df['generated_rating'] = rating
-                output_path = config.get("output_path", "data/generated_reviews.csv")
-                
-                # Check if file exists to determine if we need to write the header
-                file_exists = os.path.isfile(output_path)
-                
-                df.to_csv(output_path, mode='a', header=not file_exists, index=False)
-                print(f"💾 Appended {len(df)} reviews to {output_path}")
-
-        total_duration = time.time() - start_time
-        total_accepted = len(all_accepted)
-        avg_time = total_duration / total_accepted if total_accepted > 0 else 0
+# --- Orchestration ---
 
-        print("\n" + "="*50)
-        print("📊 FINAL EXECUTION REPORT")
-        print("="*50)
-        print(f"✅ Total Accepted Reviews:  {total_accepted}")
-        print(f"🔢 Total Generated Reviews: {grand_total_generated}")
-        print(f"⏱️  Total Duration:        {total_duration:.2f}s")
-        print(f"⚡ Time per Accepted Review: {avg_time:.2f}s")
-        print("="*50)
-
-        # --- Generate Quality Report ---
-        report_path = config.get("report_path", "data/quality_report.md")
-        
-        # Load Real Data for Comparison
-        real_csv_path = config.get("ReviewGenerator", {}).get("csv_path", "data/real_reviews_capterra.csv")
-        try:
-            df_real = pd.read_csv(real_csv_path)
-            real_count = len(df_real)
-            # Calculate avg word count for real reviews (assuming 'pros', 'cons', 'general' columns)
-            # Simple approximation: combining columns
-            df_real['text'] = df_real.get('general', '') + " " + df_real.get('pros', '') + " " + df_real.get('cons', '')
-            real_avg_len = df_real['text'].str.split().str.len().mean()
-        except Exception as e:
-            print(f"⚠️ Could not load real data for comparison: {e}")
-            real_count = 0
-            real_avg_len = 0
-
-        # Calculate Synthetic Metrics
-        if all_accepted:
-             df_synth = pd.DataFrame(all_accepted)
-             synth_avg_len = (df_synth.get('general', '') + " " + df_synth.get('pros', '') + " " + df_synth.get('cons', '')).str.split().str.len().mean()
-             avg_quality = df_synth['quality_score'].mean() if 'quality_score' in df_synth.columns else 0
+def run_rating(app, rating, target_count, tracker=None):
+    """
+    Runs the generate/judge/filter graph for a single rating until its target is met.
+    With a RunTracker (and a checkpointed graph), an interrupted thread for this rating
+    is resumed from its last checkpoint instead of starting over.
+    """
+    print(f"\n" + "="*50)
+    print(f"🎯 Processing Rating {rating} (Target: {target_count} reviews)")
+    print("="*50)
+
+    run_config = {"recursion_limit": 50}
+    snapshot = None
+    if tracker is not None and app.checkpointer is not None:
+        run_config["configurable"] = {"thread_id": tracker.thread_id(rating)}
+        snapshot = app.get_state(run_config)
+
+    if snapshot is not None and snapshot.values:
+        accepted_so_far = len(snapshot.values.get("accepted_reviews", []))
+        if snapshot.next:
+            print(f"♻️ Resuming rating {rating} from checkpoint ({accepted_so_far} reviews already accepted)")
+            final_state = app.invoke(None, run_config)
         else:
-            synth_avg_len = 0
-            avg_quality = 0
+            # Finished before the previous process could save it
+            print(f"♻️ Rating {rating} already completed in checkpoint ({accepted_so_far} reviews)")
+            final_state = snapshot.values
+    else:
+        initial_state = {
+            "target_rating": rating,
+            "required_count": target_count,
+            "accepted_reviews": [],
+            "current_generated_reviews": [],
+            "cumulative_generated": 0,
+            "cumulative_surplus": 0,
+            "current_judgments": [],
+            "iteration": 1
+        }
+        final_state = app.invoke(initial_state, run_config)
+
+    # Surplus reviews passed judging too, so they count towards the yield
+    passed = len(final_state.get("accepted_reviews", [])) + final_state.get("cumulative_surplus", 0)
+    get_planner().record_run(final_state.get("required_count", target_count), final_state.get("iteration", 1) - 1,
+                             final_state.get("cumulative_generated", 0), passed)
+    return final_state
+
+def run_distribution(app, jobs, parallel=False, tracker=None):
+    """
+    Runs every (rating, target_count) job and yields (rating, final_state) as each one finishes.
+    In parallel mode the rating graphs run concurrently; LLM calls stay bounded by the
+    registry's global concurrency cap.
+    """
+    if not parallel or len(jobs) <= 1:
+        for rating, target_count in jobs:
+            yield rating, run_rating(app, rating, target_count, tracker)
+        return
+
+    print(f"⚡ Running {len(jobs)} rating pipelines in parallel")
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = {executor.submit(run_rating, app, rating, target_count, tracker): rating for rating, target_count in jobs}
+        for future in as_completed(futures):
+            rating = futures[future]
+            try:
+                yield rating, future.result()
+            except Exception as e:
+                print(f"❌ Rating {rating} pipeline failed: {e}")
+                failed.append(rating)
+    # The other ratings are saved by now; the run still fails, so it is resumed rather than finished
+    if failed:
+        raise RuntimeError(f"rating pipeline(s) {sorted(failed)} failed")
+
+def open_output(output_path, run_id=None):
+    """Opens the configured output sink (Parquet / JSONL / legacy CSV, see src/utils/output_sink.py)."""
+    return open_sink(
+        output_path,
+        config.get("output_format", None),
+        buffer_size=config.get("output_buffer_size", 500),
+        run_id=run_id,
+        generator_model=config.get("ReviewGenerator", {}).get("model"),
+        judge_model=config.get("ReviewJudge", {}).get("model")
+    )
 
-        yield_rate = (total_accepted / grand_total_generated * 100) if grand_total_generated > 0 else 0
+def save_reviews(accepted, sink):
+    """Hands accepted reviews to the output sink, which writes them in buffered batches. Thread-safe."""
+    if not accepted:
+        return
+
+    start = time.perf_counter()
+    sink.write(accepted)
+    get_metrics().record("io", name="output_io", rating=accepted[0].get("generated_rating"), rows=len(accepted), duration_s=time.perf_counter() - start)
+    print(f"💾 Queued {len(accepted)} reviews for {sink.path} ({sink.rows_written} written so far)")
+
+def compute_realism(output_path):
+    """Corpus-level realism metrics of everything in the output against the real corpus, or None."""
+    cfg = config.get("realism_metrics", {})
+    if not cfg.get("enabled", True):
+        return None
+    from src.utils.realism_metrics import realism_report
+    synthetic = read_output(output_path, config.get("output_format", None))
+    if synthetic.empty or "generated_rating" not in synthetic.columns:
+        return None
+    generator = get_generator()
+    start = time.perf_counter()
+    try:
+        results = realism_report(generator.df, synthetic, generator.rating_column, "generated_rating",
+                                 max_self_bleu_docs=cfg.get("max_self_bleu_docs", 5000), seed=config.get("seed") or 0)
+    except Exception as e:
+        print(f"⚠️ Could not compute realism metrics: {e}")
+        return None
+    print(f"📐 Realism metrics over {len(synthetic)} reviews computed in {time.perf_counter() - start:.2f}s")
+    return results
 
-        report_content = f"""# 📊 DevTools Review Forge - Quality Report
+def write_quality_report(report_path, distribution, duration, metrics, llm_cache, realism=None):
+    """
+    Renders the markdown quality report from the streaming aggregators (src/utils/quality_stats.py)
+    and the running latency aggregates of the metrics recorder (src/utils/metrics.py), so it costs
+    the same however many reviews have been generated. Safe to call mid-run.
+    """
+    quality = get_quality_stats()
+    total_accepted = quality.accepted
+    avg_time = duration / total_accepted if total_accepted > 0 else 0
+    # Share of generated reviews that passed judging, including surplus over the target
+    yield_rate = ((total_accepted + quality.surplus) / quality.generated * 100) if quality.generated > 0 else 0
+    actual_iterations, naive_iterations = get_planner().iterations_summary()
+    iterations_saved = naive_iterations - actual_iterations
+    cache_stats = llm_cache.stats() if llm_cache else {"hits": 0, "misses": 0, "hit_rate": 0.0}
+    reviews_skipped, judge_calls_saved = prefilter_savings()
+
+    # Real baseline from the corpus the agents already parsed (see registry.get_corpus)
+    global _baseline
+    if _baseline is None:
+        generator = get_generator()
+        _baseline = corpus_baseline(generator.df, generator.rating_column, seed=config.get("seed", None))
+    baseline = _baseline
+
+    report_content = f"""# 📊 DevTools Review Forge - Quality Report
 **Date:** {time.strftime('%Y-%m-%d %H:%M:%S')}
 
 ## 1. System Performance
 | Metric | Value |
 | :--- | :--- |
-| **Total Generated** | {grand_total_generated} |
+| **Total Generated** | {quality.generated} |
 | **Total Accepted** | {total_accepted} |
+| **Surplus (passed, over target)** | {quality.surplus} |
 | **Yield Rate** | {yield_rate:.1f}% |
-| **Execution Time** | {total_duration:.2f}s |
+| **Execution Time** | {duration:.2f}s |
 | **Avg Time / Review** | {avg_time:.2f}s |
+| **Generate→Judge Iterations** | {actual_iterations} (est. {naive_iterations} without adaptive planning, {iterations_saved} saved) |
+| **LLM Cache Hits / Misses** | {cache_stats['hits']} / {cache_stats['misses']} ({cache_stats['hit_rate'] * 100:.1f}%) |
+| **Reviews Skipped by Prefilter** | {reviews_skipped} (≈ {judge_calls_saved:.1f} judge calls saved) |
 
 ## 2. Quality & Realism
 | Metric | Synthetic | Real (Baseline) |
 | :--- | :--- | :--- |
-| **Avg Word Count** | {synth_avg_len:.0f} words | {real_avg_len:.0f} words |
-| **Avg Quality Score (Judge)** | {avg_quality:.1f} / 10 | N/A |
+| **Avg Word Count** | {quality.word_count.mean:.0f} words (σ {quality.word_count.std:.0f}) | {baseline['word_count'].mean:.0f} words (σ {baseline['word_count'].std:.0f}) |
+| **Avg Quality Score (Judge)** | {quality.quality.mean:.1f} / 10 (σ {quality.quality.std:.1f}) | N/A |
 
+### Top Rejection Reasons
+| Reason | Count |
+| :--- | :--- |
+"""
+    rejections = quality.top_rejections(5)
+    for reason, count in rejections:
+        report_content += f"| {reason.replace('|', '')} | {count} |\n"
+    if not rejections:
+        report_content += "| _None_ | 0 |\n"
+
+    if realism:
+        # Synthetic / real where both sides have a value; computed at the end of the run only
+        report_content += "\n### Realism Metrics\n"
+        from src.utils.realism_metrics import render_realism_table
+        report_content += render_realism_table(realism)
+
+    report_content += f"""
 ## 3. Configuration Snapshot
 - **Generator Model**: `{config.get("ReviewGenerator", {}).get("model")}`
 - **Judge Model**: `{config.get("ReviewJudge", {}).get("model")}`
@@ -280,52 +576,333 @@ if __name__ == "__main__":
 ## 4. Observations
 - **Yield Analysis**: A low yield rate (<50%) suggests the Generator is struggling to meet the Judge's strict criteria. Check `ReviewJudge.py` rejection reasons.
 - **Length Mismatch**: Significant differences in word count may indicate the model is too verbose or too brief compared to real users.
+- **Realism Metrics**: Low vocabulary overlap, high Self-BLEU (repetitive reviews), a large length KS statistic or a large TF-IDF centroid distance (different topics) point to synthetic reviews that do not read like the real ones.
 
 ## 5. Side-by-Side Comparison
 | Rating | Real Sample | Synthetic Sample |
 | :--- | :--- | :--- |
 """
+    for r in range(1, 6):
+        real = baseline["samples"].get(float(r))
+        synth = quality.sample(float(r))
+        real_text = review_snippet(real) if real else "_No data_"
+        synth_text = review_snippet(synth) if synth else "_No generated data_"
+        report_content += f"| **{r} Stars** | {real_text} | {synth_text} |\n"
+
+    # --- Latency Breakdown (from the instrumentation events) ---
+    report_content += "\n## 6. Latency Breakdown\n"
+    report_content += metrics.render_latency_breakdown()
+
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # A temporary file of its own per write, so concurrent writers never clobber each other's half-written report
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory or ".",
+                                     prefix=f".{os.path.basename(report_path)}.", suffix=".tmp", delete=False) as f:
+        f.write(report_content)
+    try:
+        os.replace(f.name, report_path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+def start_report_refresher(report_path, distribution, start_time, metrics, llm_cache, interval):
+    """
+    Rewrites the report every `interval` seconds on a daemon thread; each rewrite only reads
+    running aggregates, never the event history. Returns a function that stops the refresher
+    and waits for a refresh in progress to finish.
+    """
+    stop = threading.Event()
+    if not interval or interval <= 0:
+        return stop.set
+
+    def refresh():
+        while not stop.wait(interval):
+            try:
+                write_quality_report(report_path, distribution, time.time() - start_time, metrics, llm_cache)
+            except Exception as e:
+                print(f"⚠️ Could not refresh the quality report: {e}")
+
+    thread = threading.Thread(target=refresh, name="report-refresher", daemon=True)
+    thread.start()
+
+    def stop_refresher():
+        stop.set()
+        thread.join()
+    return stop_refresher
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DevTools Review Forge - generate and judge synthetic reviews.")
+    parser.add_argument("-n", "--count", type=int, default=None, help="Total number of reviews needed (prompted for if omitted)")
+    parser.add_argument("--distribution", type=float, nargs=5, default=None, metavar="RATIO",
+                        help="Share of reviews per rating 1-5 (default: rating_distribution from the config)")
+    parser.add_argument("--config", default="config/default.yaml", help="Path to the YAML config")
+    parser.add_argument("-o", "--output", default=None, help="Output path: .parquet, .jsonl or .csv (default: output_path from the config)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for few-shot sampling")
+    parser.add_argument("--concurrency", type=int, default=None, help="Max LLM calls in flight (max_llm_concurrency)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the job into N shards; without --shard-index, runs N local worker processes and merges")
+    parser.add_argument("--shard-index", type=int, default=None,
+                        help="Run only this shard (0-based), e.g. on one of several machines sharing a filesystem")
+    parser.add_argument("--merge", action="store_true", help="Merge existing shard files into the output and exit")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shards:
+        parser.error("--shard-index must be between 0 and --shards - 1")
+    return args
+
+def apply_overrides(args):
+    """
+    Reloads the config from --config and applies the CLI overrides in place.
+    Returns the unsharded output path.
+    """
+    loaded = load_config(args.config)
+    config.clear()
+    config.update(loaded)
+
+    if args.output:
+        config["output_path"] = args.output
+    if args.distribution:
+        config["rating_distribution"] = args.distribution
+    if args.seed is not None:
+        config["seed"] = args.seed
+    if args.concurrency:
+        config["max_llm_concurrency"] = args.concurrency
+    base_output_path = config.get("output_path", "data/generated_reviews.csv")
+
+    if args.shard_index is not None and args.shards > 1:
+        i, n = args.shard_index, args.shards
+        # Per-shard files, so workers never write to the same output, report, run file or checkpoint DB
+        # (observed yields stay shared: YieldPlanner.save() merges into its file under a lock)
+        for key in ("output_path", "report_path", "metrics_path"):
+            if config.get(key):
+                config[key] = shard_path(config[key], i, n)
+        checkpoint_cfg = config.setdefault("checkpoint", {})
+        checkpoint_cfg["run_file"] = shard_path(checkpoint_cfg.get("run_file", "data/.cache/active_run.json"), i, n)
+        checkpoint_cfg["path"] = shard_path(checkpoint_cfg.get("path", "data/.cache/checkpoints.sqlite"), i, n)
+        if config.get("seed") is not None:
+            config["seed"] = config["seed"] + i
+        # Provider limits are shared by all shards
+        rate_cfg = config.get("rate_limits", {})
+        for limits in [rate_cfg.get("default") or {}] + list((rate_cfg.get("models") or {}).values()):
+            for key in ("rpm", "tpm"):
+                if limits.get(key):
+                    limits[key] = max(1, limits[key] // n)
+    return base_output_path
+
+def rating_distribution():
+    """rating_distribution from the config, or uniform if it does not have 5 values."""
+    distribution = config.get("rating_distribution", [0.2, 0.2, 0.2, 0.2, 0.2])
+    if len(distribution) != 5:
+        print("⚠️ Warning: rating_distribution should have 5 values.Using default uniform.")
+        distribution = [0.2, 0.2, 0.2, 0.2, 0.2]
+    return distribution
+
+def shard_problems(args, output_path, exit_codes, merged):
+    """
+    {shard index: reason} for every shard whose worker did not complete: a non-zero exit code,
+    a run file left behind (the run was not finished), or no output although the shard had
+    reviews to generate. `merged` holds the per-rating counts of the output before the workers started.
+    """
+    run_file = config.get("checkpoint", {}).get("run_file", "data/.cache/active_run.json")
+    distribution = rating_distribution()
+    problems = {}
+    for i, code in enumerate(exit_codes):
+        shard_output = shard_path(output_path, i, args.shards)
+        had_work = any(
+            shard_target(max(0, int(args.count * ratio) - merged.get(float(r + 1), 0)), i, args.shards) > 0
+            for r, ratio in enumerate(distribution)
+        )
+        if code != 0:
+            problems[i] = f"worker exited with code {code}"
+        elif os.path.exists(shard_path(run_file, i, args.shards)):
+            problems[i] = "run did not finish (run file still present)"
+        elif had_work and not os.path.exists(shard_output):
+            problems[i] = f"no output at {shard_output}"
+    return problems
+
+def run_shards(args, argv):
+    """
+    Runs every shard as a local worker process, then merges the shard files into the output.
+    Exits with status 1 without merging if any shard did not complete.
+    """
+    output_path = config.get("output_path", "data/generated_reviews.csv")
+    fmt = config.get("output_format", None)
+    merged = count_existing(output_path, fmt=fmt) if config.get("checkpoint", {}).get("resume", True) else {}
+    print(f"🧩 Running {args.shards} shard workers for {args.count} reviews")
+    workers = []
+    for i in range(args.shards):
+        command = [sys.executable, "-m", "src.main"] + list(argv) + ["--shard-index", str(i), "--output", output_path]
+        workers.append(subprocess.Popen(command, stdin=subprocess.DEVNULL))
+    problems = shard_problems(args, output_path, [worker.wait() for worker in workers], merged)
+    if problems:
+        for i, reason in sorted(problems.items()):
+            print(f"❌ Shard {i} failed: {reason}")
+        print("❌ Not merging a partial output. Re-run the same command to resume the failed shards.")
+        sys.exit(1)
+    merge_output(output_path)
+
+def merge_output(output_path):
+    shards = find_shards(output_path)
+    if not shards:
+        print(f"ℹ️ No shard files found for {output_path}.")
+        return
+    merged, duplicates = merge_shards(output_path, shards, fmt=config.get("output_format", None))
+    print(f"🧵 Merged {merged} reviews from {len(shards)} shard(s) into {output_path} ({duplicates} duplicates skipped)")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    base_output_path = apply_overrides(args)
+    if args.shard_index is None:
+        # Once, before any shard worker starts, so they all count the imported reviews
+        migrate_legacy_csv(base_output_path, config.get("output_format", None))
+
+    if args.merge:
+        merge_output(config.get("output_path", "data/generated_reviews.csv"))
+        return
+    if args.shards > 1 and args.shard_index is None:
+        if args.count is None:
+            print("❌ Error: --count is required with --shards.")
+            sys.exit(1)
+        run_shards(args, argv)
+        return
+
+    print("🚀 DevTools Review Forge - Agentic Workflow")
+    
+    metrics = None
+    stop_refresher = None
+    try:
+        if args.count is not None:
+            total_count = args.count
+        else:
+            count_input = input("Total Number of Reviews Needed (Approx): ").strip()
+            total_count = int(count_input)
         
-        # Add Samples rows
-        rating_col = config.get("ReviewGenerator", {}).get("rating_column", "rating")
-        
-        for r in range(1, 6):
-            rating_val = float(r)
+        # Get distribution or default to uniform
+        distribution = rating_distribution()
             
-            # --- Get Real Sample ---
-            real_text = "_No data_"
-            if 'df_real' in locals() and not df_real.empty and rating_col in df_real.columns:
-                # Ensure type matching
-                try:
-                    matches = df_real[df_real[rating_col].astype(float) == rating_val]
-                    if not matches.empty:
-                        row = matches.sample(n=1).iloc[0]
-                        # Combine text fields
-                        raw_text = f"{row.get('general', '')} {row.get('pros', '')} {row.get('cons', '')}"
-                        # Truncate and clean for markdown table
-                        clean_text = raw_text.replace('\n', ' ').replace('|', '')
-                        real_text = (clean_text[:150] + '...') if len(clean_text) > 150 else clean_text
-                except Exception:
-                    pass
-
-            # --- Get Synthetic Sample ---
-            synth_text = "_No generated data_"
-            if all_accepted:
-                df_synth_all = pd.DataFrame(all_accepted)
-                if 'generated_rating' in df_synth_all.columns:
-                     matches = df_synth_all[df_synth_all['generated_rating'] == rating_val]
-                     if not matches.empty:
-                        row = matches.sample(n=1).iloc[0]
-                        raw_text = f"{row.get('general', '')} {row.get('pros', '')} {row.get('cons', '')}"
-                        clean_text = raw_text.replace('\n', ' ').replace('|', '')
-                        synth_text = (clean_text[:150] + '...') if len(clean_text) > 150 else clean_text
-
-            report_content += f"| **{r} Stars** | {real_text} | {synth_text} |\n"
-        
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(report_content)
-        
+        print(f"📊 Target Distribution: {distribution}")
+        if args.shard_index is not None:
+            print(f"🧩 Shard {args.shard_index + 1} of {args.shards}")
+
+        parallel = config.get("parallel_ratings", False)
+        registry.configure_llm_concurrency(config.get("max_llm_concurrency", None))
+        metrics = configure_metrics(config.get("metrics_path", None))
+        configure_resilience(**config.get("resilience", {}))
+        rate_cfg = config.get("rate_limits", {})
+        registry.configure_rate_limits(rate_cfg.get("default"), rate_cfg.get("models"))
+        cache_cfg = config.get("llm_cache", {})
+        llm_cache = registry.configure_llm_cache(
+            enabled=cache_cfg.get("enabled", False),
+            path=cache_cfg.get("path", "data/.cache/llm_cache.sqlite"),
+            max_entries=cache_cfg.get("max_entries", 50000),
+            ttl_seconds=cache_cfg.get("ttl_seconds", 7 * 24 * 3600),
+            allow_sampled=cache_cfg.get("allow_sampled", False)
+        )
+        output_path = config.get("output_path", "data/generated_reviews.csv")
+
+        # Checkpoint every rating thread so an interrupted run can pick up where it stopped
+        checkpoint_cfg = config.get("checkpoint", {})
+        checkpointer = None
+        tracker = None
+        if checkpoint_cfg.get("enabled", False):
+            checkpointer = open_checkpointer(checkpoint_cfg.get("path", "data/.cache/checkpoints.sqlite"))
+        if checkpointer is not None:
+            tracker = RunTracker(checkpoint_cfg.get("run_file", "data/.cache/active_run.json"), checkpointer)
+            run_id = tracker.start(output_path, run_id=config.get("run_id"))
+            print(f"{'♻️ Resuming' if tracker.resumed else '🆔 Starting'} run {run_id}")
+
+        app = build_graph(streaming=config.get("streaming_generation", False), checkpointer=checkpointer)
+
+        # Only generate what the output is still missing per rating. A shard takes its slice of the
+        # deficit against the merged output, minus what its own file holds that is not merged yet
+        resume = checkpoint_cfg.get("resume", True)
+        sharded = args.shard_index is not None and output_path != base_output_path
+        output_format = config.get("output_format", None)
+        merged = count_existing(base_output_path if sharded else output_path, fmt=output_format) if resume else {}
+        unmerged = count_unmerged(output_path, base_output_path, fmt=output_format) if resume and sharded else {}
+        jobs = []
+        for i, ratio in enumerate(distribution):
+            rating = float(i + 1)
+            target_count = int(total_count * ratio)
+            remaining = target_count - merged.get(rating, 0)
+            if sharded:
+                remaining = shard_target(max(0, remaining), args.shard_index, args.shards) - unmerged.get(rating, 0)
+            existing = merged.get(rating, 0) + unmerged.get(rating, 0)
+            if target_count > 0 and existing > 0:
+                print(f"📂 Rating {rating}: {existing} of {target_count} already generated")
+            if remaining > 0:
+                jobs.append((rating, remaining))
+
+        # Seed the near-duplicate index with reviews generated by previous runs
+        if os.path.exists(output_path):
+            get_judge().load_history(output_path, output_format)
+        if args.shard_index is not None and os.path.exists(base_output_path):
+            # ...including what earlier merges already collected from all shards
+            get_judge().load_history(base_output_path, output_format)
+
+        start_time = time.time()
+        configure_quality_stats(sample_size=config.get("report_sample_size", 5), seed=config.get("seed", None))
+        # Rewrite the report every report_refresh_seconds while the run is in progress
+        report_path = config.get("report_path", "data/quality_report.md")
+        stop_refresher = start_report_refresher(report_path, distribution, start_time, metrics, llm_cache,
+                                           config.get("report_refresh_seconds", 60))
+
+        with open_output(output_path, run_id=tracker.run_id if tracker else None) as sink:
+            for rating, final_state in run_distribution(app, jobs, parallel=parallel, tracker=tracker):
+                # Save incrementally as each rating completes
+                save_reviews(final_state.get("accepted_reviews", []), sink)
+        print(f"💾 Wrote {sink.rows_written} reviews to {output_path}")
+
+        # Only once everything is on disk; otherwise the next start resumes this run.
+        # Also drops the run's checkpoints, so the checkpoint DB does not grow with every run
+        if tracker is not None:
+            tracker.finish()
+
+        # Joined before the final write below, so no refresh can race with it
+        stop_refresher()
+        total_duration = time.time() - start_time
+        quality = get_quality_stats()
+        total_accepted = quality.accepted
+        avg_time = total_duration / total_accepted if total_accepted > 0 else 0
+
+        print("\n" + "="*50)
+        print("📊 FINAL EXECUTION REPORT")
+        print("="*50)
+        print(f"✅ Total Accepted Reviews:  {total_accepted}")
+        if quality.surplus:
+            print(f"✂️  Surplus Not Kept:       {quality.surplus} (passed judging after the target was reached)")
+        print(f"🔢 Total Generated Reviews: {quality.generated}")
+        print(f"⏱️  Total Duration:        {total_duration:.2f}s")
+        print(f"⚡ Time per Accepted Review: {avg_time:.2f}s")
+        print(f"🏗️  Agent Registry Stats:   {registry.get_stats()}")
+        planner = get_planner()
+        planner.save()
+        actual_iterations, naive_iterations = planner.iterations_summary()
+        print(f"🔁 Iterations:            {actual_iterations} (est. {naive_iterations} without adaptive planning, {naive_iterations - actual_iterations} saved)")
+        cache_stats = llm_cache.stats() if llm_cache else {"hits": 0, "misses": 0, "hit_rate": 0.0}
+        print(f"🗄️  LLM Cache:             {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        prefilter = get_prefilter()
+        if prefilter is not None:
+            summary = prefilter.summary()
+            print(f"🧹 Prefilter:             {summary['rejected']} of {summary['checked']} reviews skipped (≈ {prefilter_savings()[1]:.1f} judge calls saved; by rule: {summary['by_rule']})")
+        print("="*50)
+
+        write_quality_report(report_path, distribution, total_duration, metrics, llm_cache,
+                             realism=compute_realism(output_path))
         print(f"\n📝 Quality Report saved to: {report_path}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        # Non-zero, so run_shards and batch schedulers see the failure
+        sys.exit(1)
+    finally:
+        if stop_refresher is not None:
+            stop_refresher()
+        if metrics is not None:
+            metrics.close()
+
+if __name__ == "__main__":
+    main()
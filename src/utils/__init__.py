@@ -1,6 +1,33 @@
-from .utils import parse_rating, load_csv_data
+import importlib
+
+# Imported on first access (PEP 562), so light submodules (metrics, sharding, ...) can be
+# used without loading numpy/pandas
+_EXPORTS = {
+    "parse_rating": ".utils",
+    "load_csv_data": ".utils",
+    "LLMCache": ".llm_cache",
+    "NearDuplicateIndex": ".dedup_index",
+    "EmbeddingIndex": ".embedding_index",
+    "FewShotStore": ".few_shot_store",
+}
 
 __all__ = [
     "parse_rating",
     "load_csv_data",
-]
\ No newline at end of file
+    "LLMCache",
+    "NearDuplicateIndex",
+    "EmbeddingIndex",
+    "FewShotStore",
+]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
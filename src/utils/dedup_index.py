@@ -0,0 +1,111 @@
+import zlib
+import threading
+from collections import defaultdict
+import numpy as np
+
+# Mersenne prime used for the universal hash family (fits a*h+b in uint64 for 32-bit h)
+_PRIME = (1 << 31) - 1
+
+
+def tokenize(text):
+    """Lowercased whitespace tokens, the unit of every near-duplicate Jaccard comparison."""
+    return frozenset(text.lower().split())
+
+
+def jaccard(tokens1, tokens2):
+    if not tokens1 or not tokens2:
+        return 0.0
+    return len(tokens1 & tokens2) / len(tokens1 | tokens2)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index for near-duplicate detection on whitespace-token Jaccard similarity.
+
+    Candidates are found by banding the MinHash signature (sub-linear lookup), then
+    verified with the exact Jaccard similarity against the stored token set, so the
+    threshold keeps the same meaning as the pairwise check it replaces.
+    With 32 bands of 4 rows, a pair at Jaccard 0.7 becomes a candidate with p > 0.999.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=128, bands=32, seed=1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._tokens = []
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _signature(self, tokens):
+        hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text):
+        """
+        Returns (doc_id, similarity) of the most similar indexed text whose Jaccard
+        similarity exceeds the threshold, or None.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        keys = self._band_keys(self._signature(tokens))
+        with self._lock:
+            return self._best_match(tokens, keys)
+
+    def add(self, text):
+        """Indexes a text and returns its doc id (None for empty text)."""
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        keys = self._band_keys(self._signature(tokens))
+        with self._lock:
+            return self._insert(tokens, keys)
+
+    def add_if_unique(self, text):
+        """
+        Atomically checks and indexes a text.
+        Returns None if it was added, or (doc_id, similarity) of the duplicate it matched.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        keys = self._band_keys(self._signature(tokens))
+        with self._lock:
+            match = self._best_match(tokens, keys)
+            if match:
+                return match
+            self._insert(tokens, keys)
+            return None
+
+    def _best_match(self, tokens, keys):
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best = None
+        for doc_id in candidates:
+            similarity = jaccard(tokens, self._tokens[doc_id])
+            if similarity > self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def _insert(self, tokens, keys):
+        doc_id = len(self._tokens)
+        self._tokens.append(tokens)
+        for band, key in enumerate(keys):
+            self._buckets[band][key].append(doc_id)
+        return doc_id
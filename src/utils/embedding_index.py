@@ -0,0 +1,144 @@
+import re
+import zlib
+import threading
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9']+")
+TEXT_FIELDS = ("general", "pros", "cons")
+
+
+def review_body(review):
+    """General + pros + cons as plain text, without section labels (what gets embedded)."""
+    return " ".join(review[f] for f in TEXT_FIELDS if isinstance(review.get(f), str))
+
+
+class HashingEmbedder:
+    """
+    Offline text embedding: word unigrams/bigrams plus character n-grams inside words,
+    hashed (with a sign bit) into a fixed number of dimensions, log-scaled and L2-normalised.
+    Character n-grams make paraphrases with inflected or reordered words still land close
+    together; no model download or fitting is needed.
+    """
+
+    def __init__(self, dim=2048, char_ngram=4):
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text):
+        words = _WORD.findall(text.lower())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        n = self.char_ngram
+        for word in words:
+            padded = f"<{word}>"
+            if len(padded) > n:
+                features += [f"#{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def embed(self, text):
+        features = self._features(text)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts):
+        return np.vstack([self.embed(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+
+class EmbeddingIndex:
+    """
+    Exact cosine-similarity search over hashed embeddings kept in one NumPy matrix: a query
+    is a single matrix-vector product against every indexed review. Same interface as
+    NearDuplicateIndex (texts in, (index, similarity) out). Thread-safe; grows by doubling.
+    Memory is dim * 4 bytes per review (8 KB at the default dim); with max_size the matrix
+    stops growing there and new reviews overwrite the oldest ones.
+    """
+
+    def __init__(self, threshold=0.85, dim=2048, embedder=None, capacity=1024, max_size=None):
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder(dim=dim)
+        self.max_size = max_size
+        if max_size:
+            capacity = min(capacity, max_size)
+        self._matrix = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self._size = 0
+        # Row the next vector goes to once the index is full (the oldest one)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, needed):
+        if needed <= len(self._matrix):
+            return
+        rows = max(needed, 2 * len(self._matrix))
+        if self.max_size:
+            rows = min(rows, self.max_size)
+        grown = np.zeros((rows, self._matrix.shape[1]), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def _append(self, vectors):
+        if self.max_size:
+            vectors = vectors[-self.max_size:]
+        count = len(vectors)
+        if not count:
+            return self._size
+        if self.max_size and self._size + count > self.max_size:
+            self._reserve(self.max_size)
+            rows = (self._next + np.arange(count)) % self.max_size
+            self._matrix[rows] = vectors
+            self._size = self.max_size
+            self._next = int(rows[-1] + 1) % self.max_size
+            return int(rows[0])
+        self._reserve(self._size + count)
+        first = self._size
+        self._matrix[first:first + count] = vectors
+        self._size += count
+        self._next = self._size % self.max_size if self.max_size else self._size
+        return first
+
+    def _best(self, vector):
+        if not self._size:
+            return None
+        scores = self._matrix[:self._size] @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, text):
+        """Adds a text and returns its index."""
+        vector = self.embedder.embed(text)
+        with self._lock:
+            return self._append(vector[None, :])
+
+    def add_many(self, texts):
+        vectors = self.embedder.embed_many(list(texts))
+        with self._lock:
+            return self._append(vectors)
+
+    def query(self, text):
+        """Returns (index, cosine similarity) of the closest text at or above threshold, else None."""
+        vector = self.embedder.embed(text)
+        with self._lock:
+            match = self._best(vector)
+        return match if match and match[1] >= self.threshold else None
+
+    def add_if_unique(self, text):
+        """
+        Atomically checks and inserts: returns the (index, similarity) match if the text is a
+        semantic duplicate, otherwise adds it and returns None.
+        """
+        vector = self.embedder.embed(text)
+        with self._lock:
+            match = self._best(vector)
+            if match and match[1] >= self.threshold:
+                return match
+            self._append(vector[None, :])
+            return None
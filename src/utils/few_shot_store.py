@@ -0,0 +1,49 @@
+import random
+import hashlib
+import threading
+
+
+def render_review(row):
+    """Renders a review row in the General/Pros/Cons format used by the prompts."""
+    def field(name):
+        value = row.get(name, 'N/A')
+        return value if isinstance(value, str) else 'N/A'
+    text = f"General: {field('general')}\n"
+    text += f"Pros: {field('pros')}\n"
+    text += f"Cons: {field('cons')}\n"
+    text += "-" * 20 + "\n"
+    return text
+
+
+class FewShotStore:
+    """
+    Real reviews grouped by rating and pre-rendered once, so prompts can draw
+    random few-shot subsets in O(k) without touching pandas.
+    """
+
+    def __init__(self, df, rating_column="rating", seed=None):
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._by_rating = {}
+        for row in df.to_dict("records"):
+            self._by_rating.setdefault(float(row[rating_column]), []).append(render_review(row))
+
+    def count(self, rating):
+        return len(self._by_rating.get(float(rating), ()))
+
+    def sample(self, rating, k, key=None):
+        """
+        Returns up to k distinct pre-rendered reviews for the rating.
+        With a key, the subset is a pure function of (seed, rating, key), so identical
+        requests render identical prompts (and hit the LLM response cache).
+        """
+        population = self._by_rating.get(float(rating), [])
+        k = min(k, len(population))
+        if k <= 0:
+            return []
+        if key is not None:
+            digest = hashlib.sha256(f"{self.seed}|{float(rating)}|{key}".encode("utf-8")).digest()
+            return random.Random(int.from_bytes(digest[:8], "big")).sample(population, k)
+        with self._lock:
+            return self._rng.sample(population, k)
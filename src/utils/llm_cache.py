@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class LLMCache:
+    """
+    Disk-backed (SQLite) cache of parsed LLM responses.
+    Entries are content-addressed by a hash of model, temperature, rendered prompt and
+    parser schema, and evicted by TTL and by least-recent access once max_entries is exceeded.
+    Only deterministic (temperature 0) calls are cached unless allow_sampled is set: replaying
+    one sampled response would silently replace every later sample of the same prompt.
+    """
+
+    def __init__(self, path="data/.cache/llm_cache.sqlite", max_entries=50000, ttl_seconds=7 * 24 * 3600, allow_sampled=False):
+        self.path = path
+        self.allow_sampled = allow_sampled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    def accepts(self, temperature):
+        """True if calls made at this temperature may be served from / stored in the cache."""
+        return self.allow_sampled or not temperature
+
+    @staticmethod
+    def make_key(model, temperature, prompt_text, schema=None):
+        """Hashes everything that determines an LLM response into a cache key."""
+        payload = json.dumps([model, temperature, prompt_text, schema], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Stores a JSON-serializable value. Values that can't be serialized are skipped."""
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            run_eviction = self._writes % 100 == 0
+        if run_eviction:
+            self.evict()
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones above max_entries."""
+        with self._lock:
+            if self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from src.utils.quality_stats import Reservoir
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100) of a list of numbers; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyStats:
+    """
+    Running count and total of one group's durations, plus a bounded uniform sample of them
+    (Reservoir) for p50/p95, so memory stays constant however many events the group sees.
+    """
+
+    def __init__(self, sample_size=1024):
+        self.count = 0
+        self.total = 0.0
+        self.sample = Reservoir(sample_size)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.sample.add(duration)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": percentile(self.sample.items, 50),
+            "p95": percentile(self.sample.items, 95),
+            "total": self.total,
+        }
+
+
+class LlmStats:
+    """Running totals of one (rating, agent) group of LLM calls; latencies cover live (uncached) calls only."""
+
+    COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "rollbacks", "retries", "cache_hits", "queue_wait_s", "errors")
+
+    def __init__(self, sample_size=1024):
+        self.latency = LatencyStats(sample_size)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.counters["queue_wait_s"] = 0.0
+
+    def add(self, event):
+        c = self.counters
+        c["calls"] += 1
+        c["prompt_tokens"] += event.get("prompt_tokens") or 0
+        c["completion_tokens"] += event.get("completion_tokens") or 0
+        c["rollbacks"] += 1 if event.get("rollback") else 0
+        c["retries"] += 1 if event.get("retry") else 0
+        c["cache_hits"] += 1 if event.get("cache_hit") else 0
+        c["queue_wait_s"] += event.get("queue_wait_s") or 0.0
+        c["errors"] += 1 if event.get("error") else 0
+        if not event.get("cache_hit"):
+            self.latency.add(event["duration_s"])
+
+    def summary(self):
+        return {**self.latency.summary(), **self.counters}
+
+
+class MetricsRecorder:
+    """
+    Thread-safe collector of structured timing events.
+    Each event updates running per-(rating, stage) and per-(rating, agent) aggregates for the
+    report, so memory does not grow with the run; if a path is set, the full event is also
+    appended to a JSONL file as it happens.
+    """
+
+    def __init__(self, path=None, sample_size=1024):
+        self.path = path
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._stages = {}
+        self._llm = {}
+        self._file = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, event_type, **fields):
+        event = {"type": event_type, "ts": round(time.time(), 3), **fields}
+        with self._lock:
+            self._aggregate(event)
+            if self._file:
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._file.flush()
+        return event
+
+    def _aggregate(self, event):
+        if event["type"] in ("node", "io"):
+            key = (event.get("rating"), event["name"])
+            for groups, group_key in ((self._nodes, key), (self._stages, event["name"])):
+                if group_key not in groups:
+                    groups[group_key] = LatencyStats(self.sample_size)
+                groups[group_key].add(event["duration_s"])
+        elif event["type"] == "llm":
+            key = (event.get("rating"), event.get("agent"))
+            if key not in self._llm:
+                self._llm[key] = LlmStats(self.sample_size)
+            self._llm[key].add(event)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def node_summary(self):
+        """{(rating, node): {"count", "p50", "p95", "total"}} over all recorded node/io events."""
+        with self._lock:
+            return {key: stats.summary() for key, stats in self._nodes.items()}
+
+    def stage_summary(self):
+        """{node: {"count", "p50", "p95", "total"}} over all ratings."""
+        with self._lock:
+            return {name: stats.summary() for name, stats in self._stages.items()}
+
+    def llm_summary(self):
+        """{(rating, agent): {...latency stats, calls, tokens, rollbacks, retries, cache_hits, queue_wait_s, errors}}."""
+        with self._lock:
+            return {key: stats.summary() for key, stats in self._llm.items()}
+
+    def render_latency_breakdown(self):
+        """Markdown tables for the "Latency breakdown" section of the quality report."""
+        lines = [
+            "| Rating | Stage | Calls | p50 | p95 | Total |",
+            "| :--- | :--- | :--- | :--- | :--- | :--- |",
+        ]
+        for (rating, name), s in sorted(self.node_summary().items(), key=_sort_key):
+            lines.append(f"| {_rating_label(rating)} | {name} | {s['count']} | {s['p50']:.2f}s | {s['p95']:.2f}s | {s['total']:.2f}s |")
+
+        lines += [
+            "",
+            "| Rating | Agent | LLM Calls | p50 | p95 | Prompt / Completion Tokens | Queue Wait | Rollbacks | Retries | Cache Hits | Errors |",
+            "| :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- |",
+        ]
+        for (rating, agent), s in sorted(self.llm_summary().items(), key=_sort_key):
+            lines.append(
+                f"| {_rating_label(rating)} | {agent} | {s['calls']} | {s['p50']:.2f}s | {s['p95']:.2f}s | "
+                f"{s['prompt_tokens']} / {s['completion_tokens']} | {s['queue_wait_s']:.2f}s | {s['rollbacks']} | {s['retries']} | {s['cache_hits']} | {s['errors']} |"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _sort_key(item):
+    (rating, name), _ = item
+    return (rating if rating is not None else float("inf"), str(name))
+
+
+def _rating_label(rating):
+    return f"{rating:.0f} Stars" if isinstance(rating, (int, float)) else "All"
+
+
+# Process-wide recorder; in-memory only until configure_metrics() gives it a file
+_recorder = MetricsRecorder()
+
+
+def configure_metrics(path=None):
+    """Replaces the process-wide recorder, optionally streaming events to a JSONL file."""
+    global _recorder
+    _recorder.close()
+    _recorder = MetricsRecorder(path)
+    return _recorder
+
+
+def get_metrics():
+    return _recorder
+
+
+def instrument_node(name, fn):
+    """Wraps a LangGraph node so each invocation records its wall time and target rating."""
+    @wraps(fn)
+    def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            _recorder.record("node", name=name, rating=state.get("target_rating"),
+                             iteration=state.get("iteration"), duration_s=time.perf_counter() - start)
+    return wrapper
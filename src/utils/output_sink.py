@@ -0,0 +1,265 @@
+import os
+import csv
+import json
+import math
+import time
+import uuid
+import threading
+from abc import ABC, abstractmethod
+
+# Fixed output schema shared by every sink
+OUTPUT_COLUMNS = [
+    "run_id",
+    "generated_rating",
+    "general",
+    "pros",
+    "cons",
+    "quality_score",
+    "judge_reason",
+    "generator_model",
+    "judge_model",
+    "created_at",
+]
+TEXT_COLUMNS = ["run_id", "general", "pros", "cons", "judge_reason", "generator_model", "judge_model", "created_at"]
+# Numeric dtypes every writer produces and every reader returns (Int64 keeps missing scores integral)
+OUTPUT_DTYPES = {"generated_rating": "float64", "quality_score": "Int64"}
+
+
+def _clean_text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value)
+
+
+def _clean_number(value, cast):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else cast(number)
+
+
+def to_record(review, run_id=None, generator_model=None, judge_model=None):
+    """Maps an accepted review dict onto OUTPUT_COLUMNS with consistent types (None for missing values)."""
+    record = {column: _clean_text(review.get(column)) for column in TEXT_COLUMNS}
+    record["run_id"] = record["run_id"] or run_id
+    record["generator_model"] = record["generator_model"] or generator_model
+    record["judge_model"] = record["judge_model"] or judge_model
+    record["created_at"] = record["created_at"] or time.strftime("%Y-%m-%dT%H:%M:%S")
+    record["generated_rating"] = _clean_number(review.get("generated_rating"), float)
+    record["quality_score"] = _clean_number(review.get("quality_score"), int)
+    return {column: record[column] for column in OUTPUT_COLUMNS}
+
+
+class OutputSink(ABC):
+    """
+    Buffered writer for accepted reviews. Rows are normalised to OUTPUT_COLUMNS and written
+    in batches of `buffer_size`; each flush is a single atomic append, so a crash never leaves
+    a partially written batch behind. Thread-safe.
+    """
+
+    def __init__(self, path, buffer_size=500, run_id=None, generator_model=None, judge_model=None):
+        self.path = path
+        self.buffer_size = max(1, int(buffer_size))
+        self.run_id = run_id
+        self.generator_model = generator_model
+        self.judge_model = judge_model
+        self.rows_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, reviews):
+        """Buffers reviews; flushes once the buffer holds at least buffer_size rows."""
+        records = [to_record(r, self.run_id, self.generator_model, self.judge_model) for r in reviews]
+        with self._lock:
+            self._buffer.extend(records)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._append(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    @abstractmethod
+    def _append(self, records):
+        """Writes one batch of normalised records to self.path in a single atomic append."""
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(OutputSink):
+    """Legacy CSV output. Keeps the header of an existing file so older outputs stay consistent."""
+
+    def _columns(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), None)
+            if header:
+                return header
+        return None
+
+    def _append(self, records):
+        import pandas as pd
+        columns = self._columns()
+        df = pd.DataFrame(records, columns=OUTPUT_COLUMNS).astype(OUTPUT_DTYPES)
+        if columns:
+            df = df.reindex(columns=columns)
+        # One write() of the whole batch, so concurrent readers never see half a batch
+        payload = df.to_csv(index=False, header=columns is None)
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class JsonlSink(OutputSink):
+    """One JSON object per line."""
+
+    def _append(self, records):
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ParquetSink(OutputSink):
+    """
+    Parquet dataset: `path` is a directory and every flush adds one part file, written to a
+    temporary name and renamed into place. Rows are split into row groups of row_group_size.
+    Requires pyarrow.
+    """
+
+    def __init__(self, path, buffer_size=500, row_group_size=None, **kwargs):
+        super().__init__(path, buffer_size=buffer_size, **kwargs)
+        self.row_group_size = row_group_size or self.buffer_size
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self._pq = pq
+        self.schema = pa.schema([
+            ("run_id", pa.string()),
+            ("generated_rating", pa.float64()),
+            ("general", pa.string()),
+            ("pros", pa.string()),
+            ("cons", pa.string()),
+            ("quality_score", pa.int64()),
+            ("judge_reason", pa.string()),
+            ("generator_model", pa.string()),
+            ("judge_model", pa.string()),
+            ("created_at", pa.string()),
+        ])
+        self._part = 0
+
+    def _flush_locked(self):
+        if self._buffer:
+            os.makedirs(self.path, exist_ok=True)
+        super()._flush_locked()
+
+    def _append(self, records):
+        table = self._pa.Table.from_pylist(records, schema=self.schema)
+        name = f"part-{self.run_id or 'run'}-{uuid.uuid4().hex[:8]}-{self._part:05d}.parquet"
+        self._part += 1
+        final_path = os.path.join(self.path, name)
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        self._pq.write_table(table, tmp_path, row_group_size=self.row_group_size)
+        os.replace(tmp_path, final_path)
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def output_format(path, fmt=None):
+    """Explicit format, else inferred from the extension (.parquet, .jsonl, otherwise csv)."""
+    if fmt:
+        return fmt.lower()
+    ext = os.path.splitext(path)[1].lower()
+    return {".parquet": "parquet", ".jsonl": "jsonl"}.get(ext, "csv")
+
+
+def open_sink(path, fmt=None, **kwargs):
+    """Builds the sink for `path` (see output_format)."""
+    return SINKS[output_format(path, fmt)](path, **kwargs)
+
+
+def with_output_dtypes(df):
+    """
+    Applies OUTPUT_DTYPES in place of whatever the file format inferred (Parquet and CSV turn
+    integer columns with missing values into float64; CSV reads all-empty text columns as NaN).
+    """
+    import pandas as pd
+    for column in df.columns.intersection(OUTPUT_COLUMNS):
+        dtype = OUTPUT_DTYPES.get(column)
+        if dtype is not None:
+            numbers = pd.to_numeric(df[column], errors="coerce")
+            df[column] = numbers.round().astype(dtype) if dtype == "Int64" else numbers.astype(dtype)
+        elif df[column].dtype.kind == "f":
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+    return df
+
+
+def legacy_csv_path(path):
+    """data/generated_reviews.parquet -> data/generated_reviews.csv (the output before Parquet became the default)."""
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def migrate_legacy_csv(path, fmt=None):
+    """
+    Imports the legacy CSV output into a Parquet output that does not exist yet, so resume counts
+    and near-duplicate history carry over. The CSV is left in place. Returns the rows imported.
+    """
+    legacy = legacy_csv_path(path)
+    if output_format(path, fmt) != "parquet" or os.path.exists(path) or legacy == path or not os.path.exists(legacy):
+        return 0
+    rows = read_output(legacy, "csv").to_dict("records")
+    if not rows:
+        return 0
+    with open_sink(path, "parquet", buffer_size=len(rows), run_id="legacy-csv") as sink:
+        sink.write(rows)
+    print(f"📦 Imported {len(rows)} reviews from legacy output {legacy} into {path}")
+    return len(rows)
+
+
+def read_output(path, fmt=None):
+    """
+    Reads back an output written by any sink, with OUTPUT_DTYPES applied; an empty DataFrame
+    if there is nothing yet.
+    """
+    import pandas as pd
+    empty = with_output_dtypes(pd.DataFrame(columns=OUTPUT_COLUMNS))
+    if not path or not os.path.exists(path):
+        return empty
+    kind = output_format(path, fmt)
+    try:
+        if kind == "parquet":
+            if os.path.isdir(path) and not any(f.endswith(".parquet") for f in os.listdir(path)):
+                return empty
+            return with_output_dtypes(pd.read_parquet(path))
+        if kind == "jsonl":
+            if os.path.getsize(path) == 0:
+                return empty
+            return with_output_dtypes(pd.read_json(path, lines=True, dtype={"quality_score": "Int64"}, convert_dates=False))
+        return with_output_dtypes(pd.read_csv(path))
+    except (ValueError, OSError, pd.errors.EmptyDataError) as e:
+        print(f"⚠️ Could not read existing output {path}: {e}")
+        return empty
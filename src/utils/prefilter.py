@@ -0,0 +1,124 @@
+import re
+import math
+import threading
+from collections import Counter
+import numpy as np
+from src.utils.quality_stats import review_word_count
+
+# Phrases the judge rubric always fails, grouped by the rule they break. None of them occurs
+# in the real reviews or in a judge-passed review; words real users do write (e.g. "plugins",
+# "game changer") are left to the judge
+DEFAULT_LEXICON = {
+    "AI self-reference": [
+        "as an ai", "i am an ai", "i'm an ai", "as a language model", "as an ai language model",
+    ],
+    "Marketing phrase": [
+        "revolutionize", "revolutionizes", "revolutionary",
+        "unparalleled", "cutting-edge", "cutting edge", "best-in-class", "take your workflow to the next level",
+        "look no further", "unlock the full potential", "seamless experience", "elevate your",
+    ],
+    "Incorrect terminology": ["the search bar"],
+    "Unsupported feature": ["video editing", "photo editing", "audio mixing", "video rendering"],
+}
+EMPTY_VALUES = {"", "n/a", "na", "none", "-", "null"}
+
+
+class ReviewPrefilter:
+    """
+    Rule-based rejection of reviews the LLM judge would certainly fail, run before judging:
+    one compiled regex over a phrase lexicon (word-bounded, case-insensitive), optional
+    `required_fields` that must be non-empty (none by default: most real reviews leave
+    pros or cons empty), and per-rating word-count bounds taken from the real corpus
+    (quantiles widened by `length_tolerance`; ratings with fewer than `min_samples` real
+    reviews use the bounds of the whole corpus). With the defaults the rules reject none of
+    the 437 real reviews. check() costs microseconds per review. Thread-safe.
+    """
+
+    def __init__(self, df, rating_column="rating", lexicon=None, required_fields=(),
+                 length_quantiles=(0.0, 1.0), length_tolerance=0.5, min_samples=20):
+        lexicon = DEFAULT_LEXICON if lexicon is None else lexicon
+        self.required_fields = tuple(required_fields or ())
+        groups = []
+        self._categories = {}
+        for i, (category, phrases) in enumerate(lexicon.items()):
+            if not phrases:
+                continue
+            # Longest first so "as an ai language model" wins over "as an ai"
+            alternation = "|".join(re.escape(p.lower()) for p in sorted(phrases, key=len, reverse=True))
+            groups.append(f"(?P<rule{i}>{alternation})")
+            self._categories[f"rule{i}"] = category
+        self._pattern = re.compile(r"(?<!\w)(?:" + "|".join(groups) + r")(?!\w)", re.IGNORECASE) if groups else None
+
+        self.length_bounds = {}
+        self.default_bounds = None
+        if df is not None and len(df):
+            words = np.array([review_word_count(row) for row in df.to_dict("records")], dtype=float)
+            ratings = df[rating_column].to_numpy(dtype=float)
+            self.default_bounds = self._bounds(words, length_quantiles, length_tolerance)
+            for rating in np.unique(ratings[~np.isnan(ratings)]):
+                if (ratings == rating).sum() >= min_samples:
+                    self.length_bounds[float(rating)] = self._bounds(words[ratings == rating], length_quantiles, length_tolerance)
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejections = Counter()
+
+    @staticmethod
+    def _bounds(words, quantiles, tolerance):
+        low, high = np.quantile(words, quantiles)
+        return max(1, math.floor(low * (1 - tolerance))), math.ceil(high * (1 + tolerance))
+
+    def _violation(self, review, rating):
+        for field in self.required_fields:
+            value = review.get(field)
+            if not isinstance(value, str) or value.strip().lower() in EMPTY_VALUES:
+                return "Empty field", f"'{field}' is empty."
+
+        if self._pattern is not None:
+            text = " ".join(v for v in (review.get(f) for f in ("general", "pros", "cons")) if isinstance(v, str))
+            match = self._pattern.search(text)
+            if match:
+                return self._categories[match.lastgroup], f"'{match.group(0)}'."
+
+        bounds = self.length_bounds.get(float(rating), self.default_bounds) if rating is not None else self.default_bounds
+        if bounds:
+            words = review_word_count(review)
+            if words < bounds[0] or words > bounds[1]:
+                return "Length out of range", f"{words} words (real reviews: {bounds[0]}-{bounds[1]})."
+        return None
+
+    def check(self, review, rating=None):
+        """Returns a FAIL judgment if a rule rejects the review, else None."""
+        violation = self._violation(review, rating)
+        with self._lock:
+            self.checked += 1
+            if violation:
+                self.rejections[violation[0]] += 1
+        if violation:
+            return {"verdict": "FAIL", "reason": f"Prefilter Failed: {violation[0]}: {violation[1]}"}
+        return None
+
+    def split(self, reviews, rating=None):
+        """Returns (passed reviews, [{"review", "judgment"}] for rejected reviews)."""
+        passed, rejected = [], []
+        for review in reviews:
+            failure = self.check(review, rating)
+            if failure:
+                rejected.append({"review": review, "judgment": failure})
+            else:
+                passed.append(review)
+        return passed, rejected
+
+    @property
+    def skipped(self):
+        """Reviews rejected so far, i.e. never sent to the judge."""
+        with self._lock:
+            return sum(self.rejections.values())
+
+    def calls_saved(self, batch_size=1):
+        """Judge calls avoided so far, when the judge takes batch_size reviews per call."""
+        return self.skipped / max(1, int(batch_size or 1))
+
+    def summary(self):
+        with self._lock:
+            return {"checked": self.checked, "rejected": sum(self.rejections.values()), "by_rule": dict(self.rejections)}
@@ -0,0 +1,196 @@
+import math
+import random
+import threading
+from collections import Counter, defaultdict
+
+TEXT_FIELDS = ("general", "pros", "cons")
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+def review_word_count(review):
+    return sum(len(_text(review.get(field)).split()) for field in TEXT_FIELDS)
+
+
+def review_snippet(review, limit=150):
+    """General/pros/cons on one line, truncated and safe to put in a markdown table cell."""
+    text = " ".join(_text(review.get(field)) for field in TEXT_FIELDS)
+    text = " ".join(text.replace("|", "").split())
+    return (text[:limit] + "...") if len(text) > limit else text
+
+
+class RunningStats:
+    """Welford's online mean/variance."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class Reservoir:
+    """Uniform sample of at most `size` items from a stream of unknown length (Algorithm R)."""
+
+    def __init__(self, size=1, rng=None):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self._rng = rng or random.Random()
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            j = self._rng.randrange(self.seen)
+            if j < self.size:
+                self.items[j] = item
+
+
+def reason_key(reason, max_length=80):
+    """Buckets free-text judge reasons by their leading clause, e.g. 'Diversity Check Failed'."""
+    text = " ".join(_text(reason).split()) or "Unknown"
+    for separator in (":", ". "):
+        if separator in text:
+            text = text.split(separator, 1)[0]
+    return text[:max_length]
+
+
+class QualityAggregator:
+    """
+    Streaming quality statistics for the report, updated by the filter node as reviews are
+    judged: running mean/variance of word count and quality score, a rejection-reason
+    histogram and a reservoir sample of accepted reviews, overall and per rating.
+    Memory does not grow with the number of reviews. Thread-safe.
+    """
+
+    def __init__(self, sample_size=1, max_reasons=50, seed=None):
+        self.sample_size = sample_size
+        self.max_reasons = max_reasons
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.accepted = 0
+        # Reviews that passed judging but were not kept because their rating had reached its target
+        self.surplus = 0
+        self.word_count = RunningStats()
+        self.quality = RunningStats()
+        self.rejections = Counter()
+        self._per_rating = defaultdict(self._new_rating)
+
+    def _new_rating(self):
+        return {
+            "generated": 0,
+            "accepted": 0,
+            "surplus": 0,
+            "word_count": RunningStats(),
+            "quality": RunningStats(),
+            "samples": Reservoir(self.sample_size, self._rng),
+        }
+
+    def record_generated(self, rating, count):
+        with self._lock:
+            self.generated += count
+            self._per_rating[float(rating)]["generated"] += count
+
+    def record_accepted(self, rating, reviews):
+        with self._lock:
+            stats = self._per_rating[float(rating)]
+            for review in reviews:
+                words = review_word_count(review)
+                score = review.get("quality_score")
+                score = float(score) if isinstance(score, (int, float)) else None
+                self.accepted += 1
+                stats["accepted"] += 1
+                self.word_count.add(words)
+                stats["word_count"].add(words)
+                self.quality.add(score)
+                stats["quality"].add(score)
+                stats["samples"].add({field: review.get(field) for field in TEXT_FIELDS})
+
+    def record_surplus(self, rating, count):
+        with self._lock:
+            self.surplus += count
+            self._per_rating[float(rating)]["surplus"] += count
+
+    def record_rejected(self, rating, reason):
+        key = reason_key(reason)
+        with self._lock:
+            if key not in self.rejections and len(self.rejections) >= self.max_reasons:
+                key = "Other"
+            self.rejections[key] += 1
+
+    def sample(self, rating):
+        """One accepted review for the rating (uniformly sampled), or None."""
+        with self._lock:
+            stats = self._per_rating.get(float(rating))
+            items = list(stats["samples"].items) if stats else []
+        return self._rng.choice(items) if items else None
+
+    def top_rejections(self, n=5):
+        with self._lock:
+            return self.rejections.most_common(n)
+
+    def rating_summary(self):
+        """{rating: {"generated", "accepted", "surplus", "avg_words", "avg_quality"}}."""
+        with self._lock:
+            return {
+                rating: {
+                    "generated": s["generated"],
+                    "accepted": s["accepted"],
+                    "surplus": s["surplus"],
+                    "avg_words": s["word_count"].mean,
+                    "avg_quality": s["quality"].mean,
+                } for rating, s in sorted(self._per_rating.items())
+            }
+
+
+def corpus_baseline(df, rating_column, seed=None):
+    """Word-count statistics and one sample per rating for the real corpus, computed in a single pass."""
+    rng = random.Random(seed)
+    word_count = RunningStats()
+    samples = defaultdict(lambda: Reservoir(1, rng))
+    for row in df.to_dict("records"):
+        word_count.add(review_word_count(row))
+        rating = row.get(rating_column)
+        if isinstance(rating, (int, float)) and not math.isnan(rating):
+            samples[float(rating)].add(row)
+    return {
+        "count": len(df),
+        "word_count": word_count,
+        "samples": {rating: reservoir.items[0] for rating, reservoir in samples.items() if reservoir.items},
+    }
+
+
+# Process-wide aggregator; replaced by configure_quality_stats() at startup
+_aggregator = QualityAggregator()
+
+
+def configure_quality_stats(sample_size=1, seed=None):
+    global _aggregator
+    _aggregator = QualityAggregator(sample_size=sample_size, seed=seed)
+    return _aggregator
+
+
+def get_quality_stats():
+    return _aggregator
@@ -0,0 +1,67 @@
+import time
+import threading
+
+# Rough characters-per-token ratio for English prompts; only used for pacing
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate for a rendered prompt."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` units per minute, holding at most one
+    minute's worth. Acquiring reserves immediately (the balance may go negative) and returns
+    how long the caller must wait, so concurrent callers queue up in arrival order without spinning.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount):
+        """Takes `amount` units and returns the seconds to wait before they are actually available."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def debit(self, amount):
+        """Takes (or, if negative, returns) units without waiting, e.g. to settle an estimate."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one model; either may be None."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    def acquire(self, estimated_tokens):
+        """Blocks until one request with `estimated_tokens` fits the limits; returns the seconds waited."""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Corrects the token bucket once the provider has reported real usage."""
+        if self.tokens and actual_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
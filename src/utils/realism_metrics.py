@@ -0,0 +1,221 @@
+"""
+Vectorized realism metrics comparing synthetic reviews with the real corpus.
+
+Both corpora are tokenized once (general + pros + cons, lowercased word tokens) into a
+sparse "coordinate" layout: a flat array of vocabulary ids plus the document each token
+belongs to. Every metric is then a handful of NumPy unique/bincount passes over those
+arrays, so the cost grows linearly with the number of tokens.
+"""
+import numpy as np
+import pandas as pd
+
+TEXT_FIELDS = ("general", "pros", "cons")
+TOKEN_PATTERN = r"[a-z0-9']+"
+# Odd 64-bit multiplier for rolling n-gram ids (uint64 arithmetic wraps around)
+_NGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _unique(values):
+    """Sorted unique values (sort-based; faster than np.unique's hash path on large int arrays)."""
+    values = np.sort(values)
+    if not len(values):
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def review_texts(df):
+    """general + pros + cons per row, lowercased, with missing values as empty strings."""
+    parts = [df[c].fillna("").astype(str) if c in df.columns else pd.Series("", index=df.index) for c in TEXT_FIELDS]
+    return (parts[0] + " " + parts[1] + " " + parts[2]).str.lower()
+
+
+class TokenizedCorpus:
+    """Flat token ids with their document index (documents are contiguous and 0-based)."""
+
+    def __init__(self, doc, ids, n_docs):
+        self.doc = doc
+        self.ids = ids
+        self.n_docs = n_docs
+
+    @property
+    def lengths(self):
+        return np.bincount(self.doc, minlength=self.n_docs)
+
+    def subset(self, doc_mask):
+        """Keeps the documents where doc_mask is True, renumbered from 0."""
+        doc_mask = np.asarray(doc_mask, dtype=bool)
+        new_index = np.cumsum(doc_mask) - 1
+        keep = doc_mask[self.doc]
+        return TokenizedCorpus(new_index[self.doc[keep]], self.ids[keep], int(doc_mask.sum()))
+
+    def ngrams(self, n):
+        """(doc, gram_id) for every n-gram that does not cross a document boundary."""
+        if n == 1:
+            return self.doc, self.ids.astype(np.uint64)
+        count = len(self.ids) - n + 1
+        if count <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+        valid = self.doc[:count] == self.doc[n - 1:]
+        grams = self.ids[:count].astype(np.uint64)
+        with np.errstate(over="ignore"):
+            for k in range(1, n):
+                grams = grams * _NGRAM_MULTIPLIER ^ self.ids[k:k + count].astype(np.uint64)
+        return self.doc[:count][valid], grams[valid]
+
+
+def tokenize(real_df, synthetic_df):
+    """Tokenizes both corpora against one shared vocabulary. Returns (real, synthetic, vocab_size)."""
+    exploded = []
+    for df in (real_df, synthetic_df):
+        tokens = review_texts(df).reset_index(drop=True).str.findall(TOKEN_PATTERN).explode().dropna()
+        exploded.append((tokens.index.to_numpy(dtype=np.int64), tokens.to_numpy(dtype=object), len(df)))
+
+    ids, vocab = pd.factorize(np.concatenate([exploded[0][1], exploded[1][1]]))
+    split = len(exploded[0][1])
+    real = TokenizedCorpus(exploded[0][0], ids[:split].astype(np.int64), exploded[0][2])
+    synthetic = TokenizedCorpus(exploded[1][0], ids[split:].astype(np.int64), exploded[1][2])
+    return real, synthetic, len(vocab)
+
+
+def distinct_n(corpus, n):
+    """Unique n-grams / total n-grams (higher = more lexical diversity)."""
+    _, grams = corpus.ngrams(n)
+    return len(_unique(grams)) / len(grams) if len(grams) else 0.0
+
+
+def vocabulary_overlap(real, synthetic):
+    """(Jaccard of the two vocabularies, share of synthetic tokens that also occur in real reviews)."""
+    real_vocab = _unique(real.ids)
+    synthetic_vocab = _unique(synthetic.ids)
+    union = len(np.union1d(real_vocab, synthetic_vocab))
+    jaccard = len(np.intersect1d(real_vocab, synthetic_vocab, assume_unique=True)) / union if union else 0.0
+    coverage = float(np.isin(synthetic.ids, real_vocab).mean()) if len(synthetic.ids) else 0.0
+    return jaccard, coverage
+
+
+def self_bleu(corpus, max_n=4, max_docs=None, rng=None):
+    """
+    Self-BLEU approximation: for each document, the share of its n-grams (n = 1..max_n) that
+    occur in at least one other document, combined as a smoothed geometric mean and averaged
+    over documents. Uses document frequency instead of clipped counts, which avoids the
+    O(N^2) pairwise comparison. Higher = documents repeat each other more.
+    """
+    if max_docs and corpus.n_docs > max_docs:
+        rng = rng or np.random.default_rng(0)
+        mask = np.zeros(corpus.n_docs, dtype=bool)
+        mask[rng.choice(corpus.n_docs, size=max_docs, replace=False)] = True
+        corpus = corpus.subset(mask)
+    if corpus.n_docs < 2:
+        return 0.0
+
+    log_precision = np.zeros(corpus.n_docs)
+    for n in range(1, max_n + 1):
+        doc, grams = corpus.ngrams(n)
+        matched = np.zeros(corpus.n_docs)
+        total = np.zeros(corpus.n_docs)
+        if len(grams):
+            _, gram_index = np.unique(grams, return_inverse=True)
+            pairs = _unique(gram_index.astype(np.int64) * corpus.n_docs + doc)
+            doc_frequency = np.bincount(pairs // corpus.n_docs, minlength=gram_index.max() + 1)
+            matched = np.bincount(doc, weights=(doc_frequency[gram_index] >= 2), minlength=corpus.n_docs)
+            total = np.bincount(doc, minlength=corpus.n_docs)
+        # Add-one smoothing keeps short documents (no 4-grams) from zeroing the score
+        log_precision += np.log((matched + 1) / (total + 1))
+    return float(np.exp(log_precision / max_n).mean())
+
+
+def ks_statistic(a, b):
+    """Two-sample Kolmogorov-Smirnov statistic (max distance between the empirical CDFs)."""
+    a = np.sort(np.asarray(a, dtype=float))
+    b = np.sort(np.asarray(b, dtype=float))
+    if not len(a) or not len(b):
+        return float("nan")
+    points = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, points, side="right") / len(a)
+    cdf_b = np.searchsorted(b, points, side="right") / len(b)
+    return float(np.abs(cdf_a - cdf_b).max())
+
+
+def _tfidf_centroid(corpus, idf, vocab_size):
+    """Mean of the L2-normalised TF-IDF vectors of a corpus (dense vector over the vocabulary)."""
+    if not corpus.n_docs or not len(corpus.ids):
+        return np.zeros(vocab_size)
+    keys = corpus.doc * vocab_size + corpus.ids
+    pairs, tf = np.unique(keys, return_counts=True)
+    doc, term = pairs // vocab_size, pairs % vocab_size
+    weights = tf * idf[term]
+    norms = np.sqrt(np.bincount(doc, weights=weights ** 2, minlength=corpus.n_docs))
+    weights = weights / norms[doc]
+    return np.bincount(term, weights=weights, minlength=vocab_size) / corpus.n_docs
+
+
+def tfidf_centroid_distance(real, synthetic, vocab_size):
+    """Cosine distance between the TF-IDF centroids of the two corpora (0 = same topic mix)."""
+    n_docs = real.n_docs + synthetic.n_docs
+    if not n_docs:
+        return float("nan")
+    document_frequency = np.zeros(vocab_size)
+    for corpus in (real, synthetic):
+        terms = _unique(corpus.doc * vocab_size + corpus.ids) % vocab_size
+        document_frequency += np.bincount(terms, minlength=vocab_size)
+    idf = np.log((1 + n_docs) / (1 + document_frequency)) + 1
+
+    a = _tfidf_centroid(real, idf, vocab_size)
+    b = _tfidf_centroid(synthetic, idf, vocab_size)
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(max(0.0, 1 - a @ b / denominator)) if denominator else float("nan")
+
+
+def compare(real, synthetic, vocab_size, max_self_bleu_docs=5000, seed=0):
+    """All realism metrics for one pair of corpora."""
+    rng = np.random.default_rng(seed)
+    jaccard, coverage = vocabulary_overlap(real, synthetic)
+    # Self-BLEU grows with corpus size, so both sides are scored on the same number of documents
+    sample = min(real.n_docs, synthetic.n_docs, max_self_bleu_docs)
+    return {
+        "real_docs": real.n_docs,
+        "synthetic_docs": synthetic.n_docs,
+        "vocab_jaccard": jaccard,
+        "vocab_coverage": coverage,
+        "distinct_1": (distinct_n(synthetic, 1), distinct_n(real, 1)),
+        "distinct_2": (distinct_n(synthetic, 2), distinct_n(real, 2)),
+        "self_bleu": (self_bleu(synthetic, max_docs=sample, rng=rng), self_bleu(real, max_docs=sample, rng=rng)),
+        "length_ks": ks_statistic(synthetic.lengths, real.lengths),
+        "tfidf_centroid_distance": tfidf_centroid_distance(real, synthetic, vocab_size),
+    }
+
+
+def realism_report(real_df, synthetic_df, real_rating_column="rating", synthetic_rating_column="generated_rating",
+                   max_self_bleu_docs=5000, seed=0):
+    """
+    Realism metrics overall ("All") and per rating present in the synthetic set.
+    Ratings must already be numeric in both frames.
+    """
+    real, synthetic, vocab_size = tokenize(real_df, synthetic_df)
+    results = {"All": compare(real, synthetic, vocab_size, max_self_bleu_docs, seed)}
+
+    real_ratings = pd.to_numeric(real_df[real_rating_column], errors="coerce").to_numpy()
+    synthetic_ratings = pd.to_numeric(synthetic_df[synthetic_rating_column], errors="coerce").to_numpy()
+    for rating in sorted(set(synthetic_ratings[~np.isnan(synthetic_ratings)])):
+        real_subset = real.subset(real_ratings == rating)
+        if not real_subset.n_docs:
+            continue
+        results[float(rating)] = compare(real_subset, synthetic.subset(synthetic_ratings == rating),
+                                         vocab_size, max_self_bleu_docs, seed)
+    return results
+
+
+def render_realism_table(results):
+    """Markdown table for the quality report (synthetic / real where both sides have a value)."""
+    lines = [
+        "| Rating | Docs (Synthetic / Real) | Vocab Jaccard | Synthetic Tokens in Real Vocab | Distinct-1 | Distinct-2 | Self-BLEU | Length KS | TF-IDF Centroid Distance |",
+        "| :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- | :--- |",
+    ]
+    for rating, m in results.items():
+        label = rating if rating == "All" else f"{rating:.0f} Stars"
+        lines.append(
+            f"| {label} | {m['synthetic_docs']} / {m['real_docs']} | {m['vocab_jaccard']:.2f} | {m['vocab_coverage'] * 100:.1f}% | "
+            f"{m['distinct_1'][0]:.2f} / {m['distinct_1'][1]:.2f} | {m['distinct_2'][0]:.2f} / {m['distinct_2'][1]:.2f} | "
+            f"{m['self_bleu'][0]:.2f} / {m['self_bleu'][1]:.2f} | {m['length_ks']:.2f} | {m['tfidf_centroid_distance']:.2f} |"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,231 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+from src.utils.metrics import percentile
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailableError"}
+
+
+def is_retryable(error):
+    """True for rate limits, 5xx and transport errors; False for e.g. malformed JSON replies."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    # Matched on the class hierarchy: langchain-openai re-raises e.g. APITimeoutError as a subclass
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker. Opens after failure_threshold consecutive retryable failures,
+    then lets a single trial call through once reset_timeout has elapsed (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Whether a call to this model should be attempted now."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Sliding window of recent successful call latencies for one model."""
+
+    def __init__(self, size=200):
+        self._lock = threading.Lock()
+        self._values = deque(maxlen=size)
+
+    def add(self, value):
+        with self._lock:
+            self._values.append(value)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+    def percentile(self, q):
+        with self._lock:
+            return percentile(list(self._values), q)
+
+
+class ResiliencePolicy:
+    """
+    Shared resilient-call layer for primary/rollback model pairs:
+    jittered exponential backoff on retryable errors, a circuit breaker per model that
+    routes straight to the rollback model while the primary is unhealthy, and optional
+    hedging that also fires the rollback model once the primary exceeds a latency percentile.
+    """
+
+    def __init__(self, max_retries=3, backoff_base=1.0, backoff_max=30.0,
+                 breaker_failure_threshold=5, breaker_reset_timeout=60.0,
+                 hedge=False, hedge_percentile=95, hedge_min_samples=20):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latencies = {}
+        self._executor = None
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_timeout)
+            return self._breakers[model]
+
+    def latencies(self, model):
+        with self._lock:
+            if model not in self._latencies:
+                self._latencies[model] = LatencyWindow()
+            return self._latencies[model]
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter: uniformly in [50%, 100%] of base * 2^attempt, capped."""
+        return min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def call_with_retries(self, model, fn, record_latency=True):
+        """
+        Calls fn(attempt) until it succeeds, retrying retryable errors with backoff.
+        Feeds the model's circuit breaker and, unless record_latency is False (e.g. a streamed
+        call that only returns once its first chunk arrives), its latency window.
+        """
+        breaker = self.breaker(model)
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                result = fn(attempt)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The endpoint answered (e.g. with malformed JSON), so it is not unhealthy
+                    breaker.record_success()
+                    raise
+                if attempt >= self.max_retries:
+                    breaker.record_failure()
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"⏳ {model} failed ({type(e).__name__}); retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            if record_latency:
+                self.latencies(model).add(time.perf_counter() - start)
+            return result
+
+    def call(self, primary_model, primary_fn, rollback_model=None, rollback_fn=None, hedge=True):
+        """
+        Runs primary_fn (already wrapped with retries) and falls back to rollback_fn on failure,
+        skipping the primary entirely while its circuit is open. hedge=False opts out of hedging.
+        """
+        if rollback_fn is None:
+            return primary_fn()
+
+        if not self.breaker(primary_model).allow():
+            print(f"🚧 Circuit open for {primary_model}; routing to {rollback_model}")
+            return rollback_fn()
+
+        if self.hedge and hedge:
+            threshold = self._hedge_threshold(primary_model)
+            if threshold is not None:
+                return self._hedged(threshold, primary_fn, rollback_model, rollback_fn)
+
+        try:
+            return primary_fn()
+        except Exception as e:
+            print(f"❌ Error with primary model {primary_model}: {e}")
+            print(f"🔄 Attempting rollback with model: {rollback_model}")
+            return rollback_fn()
+
+    def _hedge_threshold(self, model):
+        window = self.latencies(model)
+        if len(window) < self.hedge_min_samples:
+            return None
+        return window.percentile(self.hedge_percentile)
+
+    def _hedged(self, threshold, primary_fn, rollback_model, rollback_fn):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+            executor = self._executor
+
+        primary = executor.submit(primary_fn)
+        try:
+            return primary.result(timeout=threshold)
+        except FutureTimeoutError:
+            pass
+        except Exception as e:
+            print(f"❌ Error with primary model: {e}")
+            print(f"🔄 Attempting rollback with model: {rollback_model}")
+            return rollback_fn()
+
+        print(f"🏇 Primary slower than {threshold:.1f}s; hedging with {rollback_model}")
+        hedge = executor.submit(rollback_fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower call keeps running in the background; its result is discarded
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+# Process-wide policy; replaced by configure_resilience() at startup
+_policy = ResiliencePolicy()
+
+
+def configure_resilience(**settings):
+    global _policy
+    _policy = ResiliencePolicy(**settings)
+    return _policy
+
+
+def get_resilience():
+    return _policy
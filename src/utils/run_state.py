@@ -0,0 +1,114 @@
+import os
+import json
+import uuid
+import time
+import sqlite3
+import threading
+from collections import Counter
+from src.utils.utils import parse_rating
+from src.utils.output_sink import read_output
+
+
+def open_checkpointer(path):
+    """
+    Opens a LangGraph SqliteSaver at `path`, shared by every rating thread.
+    Returns None (runs are then not resumable) if langgraph-checkpoint-sqlite is missing.
+    """
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        print("⚠️ langgraph-checkpoint-sqlite is not installed; runs will not be resumable.")
+        return None
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return SqliteSaver(conn)
+
+
+class RunTracker:
+    """
+    Remembers the ID of the run in progress next to the checkpoint database, so a run
+    that died midway is picked up again (same per-rating thread IDs) on the next start.
+    The run file also lists the thread IDs handed out, so finish() can delete their
+    checkpoints even for ratings that completed in an earlier, interrupted process.
+    """
+
+    def __init__(self, path, checkpointer=None):
+        self.path = path
+        self.checkpointer = checkpointer
+        self.run_id = None
+        self.output_path = None
+        self.resumed = False
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def start(self, output_path, run_id=None):
+        """Resumes the unfinished run for output_path, or starts a new one. Returns the run ID."""
+        active = self._load()
+        if run_id:
+            self.resumed = active.get("run_id") == run_id
+        elif active.get("run_id") and active.get("output_path") == output_path:
+            run_id = active["run_id"]
+            self.resumed = True
+        else:
+            run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+        self.run_id = run_id
+        self.output_path = output_path
+        with self._lock:
+            self._threads = set(active.get("threads", [])) if self.resumed else set()
+            self._save_locked()
+        return run_id
+
+    def thread_id(self, rating):
+        thread_id = f"{self.run_id}:{float(rating)}"
+        with self._lock:
+            if thread_id not in self._threads:
+                self._threads.add(thread_id)
+                self._save_locked()
+        return thread_id
+
+    def finish(self):
+        """
+        Marks the run as complete: deletes the checkpoints of its rating threads, then the
+        run file. The next start begins a new run.
+        """
+        with self._lock:
+            threads = sorted(self._threads)
+        if self.checkpointer is not None:
+            for thread_id in threads:
+                self.checkpointer.delete_thread(thread_id)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save_locked(self):
+        self._save({"run_id": self.run_id, "output_path": self.output_path, "threads": sorted(self._threads)})
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, payload):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.path)
+
+
+def count_existing(output_path, rating_column="generated_rating", fmt=None):
+    """Counts reviews per rating already written to the output (empty if there is none)."""
+    df = read_output(output_path, fmt)
+    if rating_column not in df.columns:
+        return Counter()
+    ratings = df[rating_column].map(parse_rating).dropna()
+    return Counter(float(r) for r in ratings)
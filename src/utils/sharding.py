@@ -0,0 +1,68 @@
+import os
+import re
+import glob
+from collections import Counter
+from src.utils.utils import parse_rating
+from src.utils.output_sink import open_sink, read_output
+
+TEXT_COLUMNS = ("general", "pros", "cons")
+
+
+def shard_target(target_count, shard_index, shards):
+    """This shard's slice of a per-rating target; the remainder goes to the first shards."""
+    base, extra = divmod(int(target_count), shards)
+    return base + (1 if shard_index < extra else 0)
+
+
+def shard_path(path, shard_index, shards):
+    """data/generated_reviews.csv -> data/generated_reviews.shard-2-of-4.csv"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{shard_index}-of-{shards}{ext}"
+
+
+def find_shards(path):
+    """Every shard file written for `path`, in shard order."""
+    root, ext = os.path.splitext(path)
+    pattern = re.compile(re.escape(root) + r"\.shard-(\d+)-of-\d+" + re.escape(ext) + "$")
+    matches = [(int(m.group(1)), p) for p in glob.glob(f"{root}.shard-*-of-*{ext}") if (m := pattern.match(p))]
+    return [p for _, p in sorted(matches)]
+
+
+def _fingerprint(row):
+    return "\x1f".join(" ".join(str(row.get(c, "")).lower().split()) for c in TEXT_COLUMNS)
+
+
+def count_unmerged(shard_file, output_path, rating_column="generated_rating", fmt=None):
+    """Counts reviews per rating in a shard file that have not been merged into output_path yet."""
+    shard = read_output(shard_file, fmt)
+    if rating_column not in shard.columns:
+        return Counter()
+    merged = {_fingerprint(row) for row in read_output(output_path, fmt).to_dict("records")}
+    ratings = (parse_rating(row.get(rating_column)) for row in shard.to_dict("records") if _fingerprint(row) not in merged)
+    return Counter(float(r) for r in ratings if r is not None)
+
+
+def merge_shards(output_path, shard_paths, fmt=None):
+    """
+    Appends the rows of every shard to output_path, skipping reviews whose text already
+    appears in the output or in an earlier shard. Safe to re-run. `fmt` is the configured
+    output format (None = from the extension), used for the output and every shard.
+    Returns (rows_merged, duplicates_skipped).
+    """
+    seen = {_fingerprint(row) for row in read_output(output_path, fmt).to_dict("records")}
+
+    merged = 0
+    duplicates = 0
+    with open_sink(output_path, fmt) as sink:
+        for path in shard_paths:
+            rows = []
+            for row in read_output(path, fmt).to_dict("records"):
+                key = _fingerprint(row)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                rows.append(row)
+            sink.write(rows)
+            merged += len(rows)
+    return merged, duplicates
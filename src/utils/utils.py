@@ -1,6 +1,4 @@
 import os
-import pandas as pd
-import yaml
 
 def parse_rating(rating):
     """Parse rating to float."""
@@ -11,6 +9,8 @@ def parse_rating(rating):
 
 def load_csv_data(csv_path):
     """Loads the reviews CSV into a pandas DataFrame."""
+    # Deferred: pandas is the slowest import in the project and only needed once data is loaded
+    import pandas as pd
     if not os.path.exists(csv_path):
         print(f"❌ Error: Data file not found at {csv_path}")
         return pd.DataFrame()
@@ -23,5 +23,7 @@ def load_csv_data(csv_path):
         return pd.DataFrame()
 
 def load_config(path="config/default.yaml"):
+    # Deferred: PyYAML takes ~20ms to import and `--help` never needs it
+    import yaml
     with open(path, "r") as f:
         return yaml.safe_load(f)
@@ -0,0 +1,156 @@
+import os
+import json
+import math
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still merged, just not serialised between processes
+    fcntl = None
+
+
+class YieldPlanner:
+    """
+    Tracks the judge acceptance rate (yield) per rating and generator model and sizes
+    generation requests as needed / expected_yield plus a safety margin, split into
+    chunks that can be generated in parallel. Observed yields persist between runs; several
+    processes (e.g. shard workers) can share one stats file, since save() merges this
+    process's new observations into the file under a lock instead of overwriting it.
+    """
+
+    def __init__(self, path="data/.cache/yield_stats.json", prior_yield=0.7, prior_weight=5,
+                 safety_margin=0.2, max_multiplier=3.0, max_chunk_size=10, enabled=True):
+        self.path = path
+        self.prior_yield = prior_yield
+        self.prior_weight = prior_weight
+        self.safety_margin = safety_margin
+        self.max_multiplier = max_multiplier
+        self.max_chunk_size = max(1, int(max_chunk_size))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = self._load()
+        # Observations recorded since the last save(), merged into the file on save
+        self._pending = {}
+        # (required, actual_iterations, generated, passed) per completed rating in this run
+        self._runs = []
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load yield stats from {self.path}: {e}")
+            return {}
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        """Adds the observations recorded since the last save to the stats file (re-read under a lock)."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        with self._file_lock():
+            stats = self._load()
+            for key, delta in pending.items():
+                entry = stats.setdefault(key, {"generated": 0, "accepted": 0})
+                entry["generated"] += delta["generated"]
+                entry["accepted"] += delta["accepted"]
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(stats, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.path)
+        with self._lock:
+            # Pick up what other processes observed meanwhile, keeping anything recorded during the save
+            for key, delta in self._pending.items():
+                entry = stats.setdefault(key, {"generated": 0, "accepted": 0})
+                entry["generated"] += delta["generated"]
+                entry["accepted"] += delta["accepted"]
+            self._stats = stats
+
+    @staticmethod
+    def _key(rating, model):
+        return f"{model}|{float(rating)}"
+
+    def expected_yield(self, rating, model):
+        """Observed yield for (rating, model), smoothed towards prior_yield."""
+        with self._lock:
+            entry = self._stats.get(self._key(rating, model), {})
+        generated = entry.get("generated", 0)
+        accepted = entry.get("accepted", 0)
+        return (accepted + self.prior_yield * self.prior_weight) / (generated + self.prior_weight)
+
+    def record(self, rating, model, generated, accepted):
+        """Records the outcome of one generate -> judge -> filter round."""
+        if generated <= 0:
+            return
+        with self._lock:
+            for stats in (self._stats, self._pending):
+                entry = stats.setdefault(self._key(rating, model), {"generated": 0, "accepted": 0})
+                entry["generated"] += generated
+                entry["accepted"] += accepted
+
+    def plan(self, rating, model, needed):
+        """Returns the chunk sizes to request so that roughly `needed` reviews get accepted."""
+        if needed <= 0:
+            return []
+        if not self.enabled:
+            return [needed]
+
+        expected = max(self.expected_yield(rating, model), 1.0 / self.max_multiplier)
+        total = math.ceil(needed * (1 + self.safety_margin) / expected)
+        total = max(needed, min(total, math.ceil(needed * self.max_multiplier)))
+
+        chunks = math.ceil(total / self.max_chunk_size)
+        base, extra = divmod(total, chunks)
+        return [base + (1 if i < extra else 0) for i in range(chunks)]
+
+    @staticmethod
+    def estimate_naive_iterations(required, yield_rate, max_iterations=10):
+        """Expected iterations when always requesting exactly the remaining deficit."""
+        if required <= 0:
+            return 0
+        if yield_rate <= 0:
+            return max_iterations
+        remaining = float(required)
+        iterations = 0
+        while remaining >= 0.5 and iterations < max_iterations:
+            remaining *= (1 - yield_rate)
+            iterations += 1
+        return iterations
+
+    def record_run(self, required, iterations, generated, passed):
+        """
+        Remembers how many iterations a rating actually took (and its yield), for the report.
+        `passed` counts every review that passed judging, including surplus over the target.
+        """
+        with self._lock:
+            self._runs.append((required, iterations, generated, passed))
+
+    def iterations_summary(self, max_iterations=10):
+        """
+        Returns (actual_iterations, estimated_iterations_without_planner) for this run,
+        estimating the fixed-deficit strategy at each rating's observed yield.
+        """
+        with self._lock:
+            runs = list(self._runs)
+        actual = sum(iterations for _, iterations, _, _ in runs)
+        naive = sum(self.estimate_naive_iterations(required, passed / generated if generated else 0.0, max_iterations)
+                    for required, _, generated, passed in runs)
+        return actual, naive
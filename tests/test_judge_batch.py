@@ -0,0 +1,44 @@
+from src.agents.ReviewJudge import ReviewJudge
+
+
+class RateLimitError(Exception):
+    """Matched by name, like openai.RateLimitError."""
+
+
+def make_judge(reply):
+    """Judge whose batch LLM call returns `reply` (or raises it); single-review calls are counted."""
+    judge = ReviewJudge.__new__(ReviewJudge)
+    judge.persona = "judge"
+    judge.review_characteristics = {}
+    judge._sample_ground_truth = lambda rating, sample_count=10, key=None: "[Real Review]\nok"
+    judge.single_calls = []
+
+    def invoke(prompt, parser, inputs):
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    judge._invoke_with_rollback = invoke
+    judge.evaluate_single_review = lambda text, rating: judge.single_calls.append(text) or {"verdict": "PASS"}
+    return judge
+
+
+def test_failed_batch_call_is_not_fanned_out():
+    judge = make_judge(RateLimitError("429"))
+    verdicts = judge.evaluate_batch(["a", "b", "c"], 5.0)
+    assert [v["verdict"] for v in verdicts] == ["ERROR"] * 3
+    assert judge.single_calls == []
+
+
+def test_reviews_missing_from_the_reply_are_judged_individually():
+    judge = make_judge({"verdicts": [{"index": 0, "verdict": "FAIL", "reason": "generic"}]})
+    verdicts = judge.evaluate_batch(["a", "b"], 5.0)
+    assert [v["verdict"] for v in verdicts] == ["FAIL", "PASS"]
+    assert judge.single_calls == ["b"]
+
+
+def test_unparseable_reply_falls_back_to_single_reviews():
+    judge = make_judge(ValueError("Invalid json output"))
+    verdicts = judge.evaluate_batch(["a", "b"], 5.0)
+    assert [v["verdict"] for v in verdicts] == ["PASS", "PASS"]
+    assert judge.single_calls == ["a", "b"]
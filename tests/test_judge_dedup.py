@@ -0,0 +1,42 @@
+import threading
+from src.agents.ReviewJudge import ReviewJudge
+from src.utils.dedup_index import NearDuplicateIndex
+
+
+class FakeSemanticIndex:
+    """Flags every review whose text mentions "paraphrase" as a semantic duplicate."""
+
+    def __init__(self):
+        self.added = []
+
+    def query(self, text):
+        return (0, 0.9) if "paraphrase" in text else None
+
+    def add(self, text):
+        self.added.append(text)
+
+
+def make_judge():
+    judge = ReviewJudge.__new__(ReviewJudge)
+    judge.history_index = NearDuplicateIndex(threshold=0.7)
+    judge.semantic_threshold = 0.85
+    judge.semantic = FakeSemanticIndex()
+    judge.semantic_index = lambda rating: judge.semantic
+    judge._remember_lock = threading.Lock()
+    return judge
+
+
+def review(general):
+    return {"general": general, "pros": "fast startup and extensions", "cons": "memory use", "generated_rating": 5.0}
+
+
+def test_semantic_reject_does_not_enter_the_jaccard_history():
+    judge = make_judge()
+    kept, rejected = judge.remember([review("a paraphrase of an accepted review")])
+    assert kept == [] and len(rejected) == 1
+    assert len(judge.history_index) == 0 and judge.semantic.added == []
+
+    # Near-identical wording, but no longer a paraphrase: nothing accepted blocks it
+    kept, rejected = judge.remember([review("a rewrite of an accepted review")])
+    assert len(kept) == 1 and rejected == []
+    assert len(judge.history_index) == 1 and len(judge.semantic.added) == 1
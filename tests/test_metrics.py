@@ -0,0 +1,15 @@
+from src.utils.metrics import MetricsRecorder
+
+
+def test_aggregates_stay_bounded():
+    metrics = MetricsRecorder(sample_size=100)
+    for i in range(5000):
+        metrics.record("node", name="judge", rating=1.0, duration_s=1.0)
+        metrics.record("llm", agent="ReviewJudge", rating=1.0, duration_s=2.0, prompt_tokens=10, cache_hit=i % 5 == 0)
+
+    node = metrics.node_summary()[(1.0, "judge")]
+    assert (node["count"], node["total"], node["p50"], node["p95"]) == (5000, 5000.0, 1.0, 1.0)
+    llm = metrics.llm_summary()[(1.0, "ReviewJudge")]
+    assert (llm["calls"], llm["cache_hits"], llm["count"], llm["prompt_tokens"]) == (5000, 1000, 4000, 50000)
+    assert len(metrics._nodes[(1.0, "judge")].sample.items) == 100
+    assert len(metrics._llm[(1.0, "ReviewJudge")].latency.sample.items) == 100
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+import src.main as main
+from src.utils.quality_stats import configure_quality_stats
+from src.utils.yield_planner import YieldPlanner
+
+
+def test_yield_is_credited_to_the_model_that_generated(monkeypatch):
+    planner = YieldPlanner(path=None)
+    monkeypatch.setattr(main, "_planner", planner)
+    monkeypatch.setattr(main, "get_generator", lambda: SimpleNamespace(model="primary"))
+    monkeypatch.setattr(main, "get_judge", lambda: SimpleNamespace(remember=lambda reviews: (reviews, [])))
+    configure_quality_stats()
+
+    def judged(i, model, verdict):
+        return {"review": {"general": f"review {i}", "generator_model": model}, "judgment": {"verdict": verdict}}
+
+    judgments = [judged(0, "primary", "PASS"), judged(1, "primary", "FAIL"),
+                 judged(2, "rollback", "PASS"), judged(3, "rollback", "PASS")]
+    main.node_filter({
+        "target_rating": 4.0,
+        "required_count": 10,
+        "accepted_reviews": [],
+        "current_generated_reviews": [j["review"] for j in judgments],
+        "current_judgments": judgments,
+    })
+    assert planner._pending == {
+        "primary|4.0": {"generated": 2, "accepted": 1},
+        "rollback|4.0": {"generated": 2, "accepted": 2},
+    }
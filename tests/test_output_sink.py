@@ -0,0 +1,10 @@
+import pytest
+from src.utils.output_sink import OutputSink
+
+
+def test_incomplete_sink_fails_on_construction(tmp_path):
+    class NoAppend(OutputSink):
+        pass
+
+    with pytest.raises(TypeError):
+        NoAppend(str(tmp_path / "out"))
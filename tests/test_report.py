@@ -0,0 +1,21 @@
+import src.main as main
+from src.utils.metrics import MetricsRecorder
+from src.utils.quality_stats import RunningStats, configure_quality_stats
+
+
+def test_report_reads_running_aggregates(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "config", {"prefilter": {"enabled": False}, "yield_planner": {"path": None}})
+    monkeypatch.setattr(main, "_planner", None)
+    monkeypatch.setattr(main, "_baseline", {"count": 0, "word_count": RunningStats(), "samples": {}})
+    configure_quality_stats()
+    metrics = MetricsRecorder(sample_size=50)
+    for _ in range(20000):
+        metrics.record("node", name="judge", rating=3.0, duration_s=0.5)
+        metrics.record("llm", agent="ReviewJudge", rating=3.0, duration_s=1.0, prompt_tokens=2)
+
+    report_path = tmp_path / "report.md"
+    main.write_quality_report(str(report_path), [0.2] * 5, 1.0, metrics, None)
+    report = report_path.read_text(encoding="utf-8")
+    # Exact counts and totals from the running aggregates, percentiles from their bounded samples
+    assert "| 3 Stars | judge | 20000 | 0.50s | 0.50s | 10000.00s |" in report
+    assert "| 3 Stars | ReviewJudge | 20000 | 1.00s | 1.00s | 40000 / 0 |" in report
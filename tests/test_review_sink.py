@@ -0,0 +1,16 @@
+from src.collector.review_sink import ScrapedReviewSink
+
+ROW = {"tool": "VS Code", "source": "Capterra", "general": "Fast editor", "pros": "Extensions", "cons": "RAM", "rating": "5.0"}
+
+
+def test_resume_url_of_an_unfinished_scrape(tmp_path):
+    output = str(tmp_path / "reviews.csv")
+    sink = ScrapedReviewSink(output)
+    sink.write_page([ROW], 3, url="https://example.com/reviews?page=3")
+
+    resumed = ScrapedReviewSink(output)
+    assert resumed.last_page == 3
+    assert resumed.resume_url == "https://example.com/reviews?page=3"
+
+    resumed.finish()
+    assert ScrapedReviewSink(output).resume_url is None
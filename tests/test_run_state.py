@@ -0,0 +1,49 @@
+import pytest
+from src.utils.run_state import RunTracker, open_checkpointer
+
+
+class FakeCheckpointer:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_thread(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+def test_finish_deletes_threads_from_an_interrupted_process(tmp_path):
+    run_file = str(tmp_path / "active_run.json")
+    first = RunTracker(run_file)
+    run_id = first.start("out.parquet")
+    first.thread_id(1.0)
+    # The process dies here; the next one resumes and only has rating 2 left
+    checkpointer = FakeCheckpointer()
+    second = RunTracker(run_file, checkpointer)
+    assert second.start("out.parquet") == run_id and second.resumed
+    second.thread_id(2.0)
+    second.finish()
+    assert sorted(checkpointer.deleted) == [f"{run_id}:1.0", f"{run_id}:2.0"]
+    assert not (tmp_path / "active_run.json").exists()
+
+
+def test_finished_run_leaves_no_checkpoints(tmp_path):
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    from typing import TypedDict
+    from langgraph.graph import StateGraph, END
+
+    class State(TypedDict):
+        value: int
+
+    graph = StateGraph(State)
+    graph.add_node("step", lambda state: {"value": state["value"] + 1})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    checkpointer = open_checkpointer(str(tmp_path / "checkpoints.sqlite"))
+    app = graph.compile(checkpointer=checkpointer)
+
+    tracker = RunTracker(str(tmp_path / "active_run.json"), checkpointer)
+    tracker.start("out.parquet")
+    for rating in (1.0, 5.0):
+        app.invoke({"value": 0}, {"configurable": {"thread_id": tracker.thread_id(rating)}})
+    assert list(checkpointer.list(None))
+    tracker.finish()
+    assert list(checkpointer.list(None)) == []
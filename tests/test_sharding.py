@@ -0,0 +1,85 @@
+import os
+import pytest
+import src.main as main
+from src.utils.sharding import shard_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeWorker:
+    """Stands in for a shard worker process: writes the shard's output, or fails like a crashed worker."""
+
+    def __init__(self, output_path, exit_code, write_output=True):
+        self.exit_code = exit_code
+        if write_output:
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write('{"general": "ok"}\n')
+
+    def wait(self):
+        return self.exit_code
+
+
+def run_sharded(monkeypatch, tmp_path, outcomes):
+    """Runs run_shards with one fake worker per (exit code, writes output) outcome; returns the merge calls."""
+    output_path = str(tmp_path / "reviews.jsonl")
+    monkeypatch.setattr(main, "config", {
+        "output_path": output_path,
+        "rating_distribution": [0.2, 0.2, 0.2, 0.2, 0.2],
+        "checkpoint": {"run_file": str(tmp_path / "active_run.json")},
+    })
+    monkeypatch.setattr(main, "count_existing", lambda path, fmt=None: {})
+    merges = []
+    monkeypatch.setattr(main, "merge_shards", lambda path, shards, fmt=None: merges.append(shards) or (0, 0))
+
+    shards = len(outcomes)
+    launched = iter(enumerate(outcomes))
+
+    def popen(command, **kwargs):
+        i, (exit_code, write_output) = next(launched)
+        return FakeWorker(shard_path(output_path, i, shards), exit_code, write_output)
+
+    monkeypatch.setattr(main.subprocess, "Popen", popen)
+    args = main.parse_args(["--count", "10", "--shards", str(shards)])
+    main.run_shards(args, ["--count", "10", "--shards", str(shards)])
+    return merges
+
+
+def test_failed_shard_blocks_merge(monkeypatch, tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        run_sharded(monkeypatch, tmp_path, [(0, True), (1, False)])
+    assert exc.value.code == 1
+
+
+def test_shard_without_output_blocks_merge(monkeypatch, tmp_path):
+    # Exits 0 but never wrote the reviews it was assigned
+    with pytest.raises(SystemExit) as exc:
+        run_sharded(monkeypatch, tmp_path, [(0, True), (0, False)])
+    assert exc.value.code == 1
+
+
+def test_completed_shards_are_merged(monkeypatch, tmp_path):
+    merges = run_sharded(monkeypatch, tmp_path, [(0, True), (0, True)])
+    assert len(merges) == 1 and len(merges[0]) == 2
+
+
+def test_merge_uses_the_configured_output_format(monkeypatch, tmp_path):
+    # .out has no format of its own; only output_format says it is JSONL
+    output_path = str(tmp_path / "reviews.out")
+    open(shard_path(output_path, 0, 1), "w").close()
+    monkeypatch.setattr(main, "config", {"output_path": output_path, "output_format": "jsonl"})
+    formats = []
+    monkeypatch.setattr(main, "merge_shards", lambda path, shards, fmt=None: formats.append(fmt) or (0, 0))
+    main.merge_output(output_path)
+    assert formats == ["jsonl"]
+
+
+def test_shard_worker_exits_non_zero_on_error(monkeypatch):
+    def outage(*args, **kwargs):
+        raise RuntimeError("LLM outage")
+
+    monkeypatch.setattr(main, "config", {})
+    monkeypatch.setattr(main.registry, "configure_llm_concurrency", outage)
+    config_path = os.path.join(ROOT, "config", "default.yaml")
+    with pytest.raises(SystemExit) as exc:
+        main.main(["--count", "10", "--shards", "2", "--shard-index", "0", "--config", config_path])
+    assert exc.value.code == 1
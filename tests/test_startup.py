@@ -0,0 +1,23 @@
+import os
+import sys
+import json
+import subprocess
+from benchmarks.bench_startup import HEAVY_MODULES, import_profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Same budget as `python -m benchmarks.bench_startup`; raise it on slow CI machines instead of skipping the test
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 100))
+RUNS = 5
+
+
+def test_importing_main_loads_no_heavy_modules():
+    """langchain, pandas, numpy & co. must stay deferred until a run needs them (see benchmarks/bench_startup.py)."""
+    code = "import sys, json, src.main; print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in %r)))" % (HEAVY_MODULES,)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout) == []
+
+
+def test_importing_main_stays_within_budget():
+    """Best cumulative `-X importtime` of src.main over RUNS cold imports."""
+    best_ms = min(import_profile("src.main", cwd=ROOT).get("src.main", 0) for _ in range(RUNS)) / 1000
+    assert 0 < best_ms <= BUDGET_MS, f"import src.main took {best_ms:.1f}ms (budget {BUDGET_MS:.0f}ms, STARTUP_BUDGET_MS overrides)"
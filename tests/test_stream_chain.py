@@ -0,0 +1,84 @@
+import threading
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents import registry
+from src.agents.base_agent import BaseAgent
+from src.utils.resilience import configure_resilience
+
+
+def make_agent():
+    # Skips BaseAgent.__init__ (corpus loading, API keys); only the LLM plumbing is exercised
+    agent = BaseAgent.__new__(BaseAgent)
+    agent.use_cache = False
+    agent.rollback_llm = None
+    return agent
+
+
+def test_inline_call_while_streaming_with_one_slot():
+    """A consumer judging each streamed item inline must not deadlock under max_llm_concurrency=1."""
+    registry.configure_llm_concurrency(1)
+    registry.configure_rate_limits()
+    try:
+        agent = make_agent()
+        prompt = PromptTemplate.from_template("{text}")
+        generator_llm = FakeListChatModel(responses=["abc"])
+        judge_llm = FakeListChatModel(responses=["PASS"])
+        results = []
+
+        def run():
+            for partial in agent.stream_chain(prompt, generator_llm, StrOutputParser(), {"text": "generate"}):
+                results.append((partial, agent.invoke_chain(prompt, judge_llm, StrOutputParser(), {"text": partial})))
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        worker.join(timeout=10)
+        assert not worker.is_alive(), "stream_chain deadlocked with a single LLM slot"
+        assert [partial for partial, _ in results] == ["a", "b", "c"]
+        assert all(verdict == "PASS" for _, verdict in results)
+    finally:
+        registry.configure_llm_concurrency(None)
+
+
+class RateLimitError(Exception):
+    """Matched by name, like openai.RateLimitError."""
+
+
+def make_streaming_agent(failures):
+    """Agent whose stream_chain fails `failures` times with a retryable error before streaming."""
+    agent = make_agent()
+    agent.model, agent.llm = "primary", "primary-llm"
+    agent.rollback_model, agent.rollback_llm = "rollback", "rollback-llm"
+    calls = []
+
+    def stream_chain(prompt, llm, parser, inputs, retry=False):
+        calls.append((llm, retry))
+        if len(calls) <= failures:
+            raise RateLimitError("429")
+        yield "a"
+        yield "b"
+
+    agent.stream_chain = stream_chain
+    return agent, calls
+
+
+def test_stream_open_is_retried_before_falling_back():
+    configure_resilience(max_retries=2, backoff_base=0.0)
+    try:
+        agent, calls = make_streaming_agent(failures=1)
+        model, chunks = agent.stream_resilient(None, None, {})
+        assert model == "primary" and list(chunks) == ["a", "b"]
+        assert calls == [("primary-llm", False), ("primary-llm", True)]
+    finally:
+        configure_resilience()
+
+
+def test_stream_falls_back_once_retries_are_exhausted():
+    configure_resilience(max_retries=2, backoff_base=0.0)
+    try:
+        agent, calls = make_streaming_agent(failures=3)
+        model, chunks = agent.stream_resilient(None, None, {})
+        assert model == "rollback" and list(chunks) == ["a", "b"]
+        assert [llm for llm, _ in calls] == ["primary-llm"] * 3 + ["rollback-llm"]
+    finally:
+        configure_resilience()